@@ -0,0 +1,75 @@
+"""Measure the per-request cost of validating an access token.
+
+    python -m benchmarks.auth --rounds 2000
+
+Compares what get_current_user used to do (jwt.decode with the raw secret or
+PEM on every request) with a key parsed once at startup and with a hit in the
+verified-token cache, for HS256 and RS256.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from typing import Callable
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def us_per_call(fn: Callable[[], object], rounds: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def rsa_pem_pair():
+    import rsa
+
+    public, private = rsa.newkeys(2048)
+    return private.save_pkcs1().decode(), public.save_pkcs1().decode()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark access token validation")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    sys.path.insert(0, REPO_ROOT)
+
+    from jose import jwk, jwt
+
+    from src import controllers
+
+    private_pem, public_pem = rsa_pem_pair()
+    setups = [
+        ("HS256", controllers.SECRET_KEY, controllers.SECRET_KEY),
+        ("RS256", private_pem, public_pem),
+    ]
+    print(f"{args.rounds} rounds per case")
+    print(f"{'case':<40}{'us/request':>12}")
+    for alg, signing, verifying in setups:
+        controllers.ALGORITHM = alg
+        controllers.signing_key = jwk.construct(signing, alg)
+        controllers.verification_key = jwk.construct(verifying, alg)
+        token = controllers.create_access_token({"sub": "1", "username": "bench"}, timedelta(minutes=30))
+
+        # uncached paths get a fresh cache miss every call
+        def decode_uncached():
+            controllers.token_cache.clear()
+            return controllers.decode_access_token(token)
+
+        cases = [
+            (f"{alg} jwt.decode, key re-parsed", lambda: jwt.decode(token, verifying, algorithms=[alg])),
+            (f"{alg} key parsed once, no cache", decode_uncached),
+            (f"{alg} verified-token cache hit", lambda: controllers.decode_access_token(token)),
+        ]
+        for name, fn in cases:
+            print(f"{name:<40}{us_per_call(fn, args.rounds):>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
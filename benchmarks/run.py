@@ -0,0 +1,272 @@
+"""Seed a database, replay a mixed workload against the API and report latency.
+
+    python -m benchmarks.run --posts 5000 --requests 2000 --concurrency 32
+    python -m benchmarks.run --mode uvicorn --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+Runs against a throwaway SQLite file by default; pass --database-url to point
+at a MySQL stand-in instead. The target database is dropped and re-seeded.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "feed=40,post=20,comments=15,like=10,comment=10,login=5"
+# the app reports its SQL statement count per request in the Server-Timing header
+SERVER_TIMING_QUERIES = re.compile(r'db;dur=[0-9.]+;desc="(\d+) queries"')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def parse_mix(raw: str) -> Dict[str, int]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+# Each operation returns (method, url, request kwargs) for a randomly chosen target
+def op_feed(ctx, rng):
+    return "GET", "/api/posts?limit=20", {}
+
+
+def op_post(ctx, rng):
+    return "GET", f"/api/posts/{rng.randint(1, ctx['posts'])}", {}
+
+
+def op_comments(ctx, rng):
+    return "GET", f"/api/posts/{rng.randint(1, ctx['posts'])}/comments?limit=20", {}
+
+
+def op_like(ctx, rng):
+    user_id = rng.randint(1, ctx["users"])
+    headers = {"Authorization": f"Bearer {ctx['tokens'][user_id]}"}
+    return "POST", f"/api/posts/{rng.randint(1, ctx['posts'])}/like", {"headers": headers}
+
+
+def op_comment(ctx, rng):
+    user_id = rng.randint(1, ctx["users"])
+    headers = {"Authorization": f"Bearer {ctx['tokens'][user_id]}"}
+    body = {"content": f"bench comment {rng.random()}"}
+    return "POST", f"/api/posts/{rng.randint(1, ctx['posts'])}/comment", {"headers": headers, "json": body}
+
+
+def op_login(ctx, rng):
+    form = {"username": f"bench_user_{rng.randint(1, ctx['users'])}", "password": ctx["password"]}
+    return "POST", "/api/auth/login", {"data": form}
+
+
+OPERATIONS = {
+    "feed": op_feed,
+    "post": op_post,
+    "comments": op_comments,
+    "like": op_like,
+    "comment": op_comment,
+    "login": op_login,
+}
+
+
+async def replay(client, ctx: dict, mix: Dict[str, int], total: int, concurrency: int, rng: random.Random) -> dict:
+    names = list(mix)
+    plan = rng.choices(names, weights=[mix[n] for n in names], k=total)
+    requests = [(name, OPERATIONS[name](ctx, rng)) for name in plan]
+    samples: Dict[str, dict] = {n: {"latencies": [], "queries": [], "errors": 0} for n in names}
+    cursor = iter(requests)
+
+    async def worker():
+        for name, (method, url, kwargs) in cursor:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - started
+            bucket = samples[name]
+            bucket["latencies"].append(elapsed)
+            timing = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+            if timing:
+                bucket["queries"].append(int(timing.group(1)))
+            if response.status_code >= 500:
+                bucket["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - started
+
+    operations = {}
+    for name, bucket in samples.items():
+        latencies = bucket["latencies"]
+        operations[name] = {
+            "count": len(latencies),
+            "errors": bucket["errors"],
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "queries_per_request": round(sum(bucket["queries"]) / len(bucket["queries"]), 2) if bucket["queries"] else None,
+        }
+    return {"requests": total, "seconds": round(wall, 3), "throughput_rps": round(total / wall, 2), "operations": operations}
+
+
+async def run_inprocess(args, mix, rng) -> dict:
+    import httpx
+
+    from benchmarks.seed import seed
+    from src.main import app
+
+    await app.router.startup()
+    try:
+        # seed after the startup hook has prepared the schema
+        ctx = await seed(args.users, args.posts, args.comments, args.likes, rng)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await replay(client, ctx, mix, args.requests, args.concurrency, rng)
+    finally:
+        await app.router.shutdown()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# uvicorn spawns its workers through multiprocessing and does not replace ones that exit
+def _worker_count(pid: int) -> int:
+    found = subprocess.run(["pgrep", "-P", str(pid), "-f", "spawn_main"], capture_output=True, text=True)
+    return len(found.stdout.split())
+
+
+async def run_uvicorn(args, mix, rng) -> dict:
+    import httpx
+
+    from benchmarks.seed import seed
+    from src.database import engine
+
+    # migrate and seed once up front; the workers skip their own startup migration
+    ctx = await seed(args.users, args.posts, args.comments, args.likes, rng)
+    await engine.dispose()
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "AUTO_MIGRATE": "false"},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not become healthy")
+            # warm up, then refuse to report numbers from fewer workers than asked for
+            await asyncio.gather(*[client.get("/health") for _ in range(args.concurrency * args.workers)])
+            running = _worker_count(server.pid) if args.workers > 1 else int(server.poll() is None)
+            if running < args.workers:
+                raise SystemExit(f"only {running} of {args.workers} uvicorn workers are running")
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            return await replay(client, ctx, mix, args.requests, args.concurrency, rng)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+    floor = baseline["throughput_rps"] * (1 - tolerance)
+    if result["throughput_rps"] < floor:
+        regressions.append(f"throughput {result['throughput_rps']} rps < {floor:.2f} rps")
+    for name, base in baseline["operations"].items():
+        current = result["operations"].get(name)
+        if not current or not base["count"]:
+            continue
+        ceiling = base["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > ceiling:
+            regressions.append(f"{name} p95 {current['p95_ms']}ms > {ceiling:.3f}ms")
+        if base.get("queries_per_request") is not None and current.get("queries_per_request") is not None:
+            if current["queries_per_request"] > base["queries_per_request"]:
+                regressions.append(f"{name} queries/request {current['queries_per_request']} > {base['queries_per_request']}")
+    return regressions
+
+
+def print_report(result: dict) -> None:
+    print(f"{result['requests']} requests in {result['seconds']}s -> {result['throughput_rps']} req/s")
+    print(f"{'operation':<10}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, op in result["operations"].items():
+        queries = "-" if op["queries_per_request"] is None else op["queries_per_request"]
+        print(f"{name:<10}{op['count']:>8}{op['errors']:>8}{op['p50_ms']:>10}{op['p95_ms']:>10}{op['p99_ms']:>10}{queries:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the API against a seeded database")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument("--likes", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn mode only)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights, default {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the JSON result here")
+    parser.add_argument("--save-baseline", help="write the JSON result as the new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    # configure the app before any src module reads its environment
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("PORT", "8000")
+    sys.path.insert(0, REPO_ROOT)
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    runner = run_uvicorn if args.mode == "uvicorn" else run_inprocess
+    result = asyncio.run(runner(args, mix, rng))
+    result["mode"] = args.mode
+    result["config"] = {k: getattr(args, k) for k in ("users", "posts", "comments", "likes", "requests", "concurrency", "mix")}
+    print_report(result)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as fh:
+                json.dump(result, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(result, json.load(fh), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
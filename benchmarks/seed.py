@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+from src.controllers import create_access_token, get_password_hash
+from src.counters import backfill_user_stats, reconcile_counts
+from src.database import engine
+from src.migrations import migrate, reset_schema
+from src.models import User, Post, Comment, Like
+
+BENCH_PASSWORD = "bench-password"
+CHUNK = 1000
+
+
+async def _insert_chunked(conn, table, rows):
+    for start in range(0, len(rows), CHUNK):
+        await conn.execute(insert(table), rows[start:start + CHUNK])
+
+
+# Builds a fresh schema and fills it through multi-row inserts; returns what the
+# workload needs to address the data (ids and ready-made bearer tokens).
+async def seed(users: int, posts: int, comments: int, likes: int, rng: random.Random, reset: bool = True) -> dict:
+    # through the migrations, so triggers and indexes they own (e.g. search) are rebuilt too
+    if reset:
+        await reset_schema(engine)
+    else:
+        await migrate(engine)
+
+    password = get_password_hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+    start = now - timedelta(days=30)
+
+    def moment():
+        return start + timedelta(seconds=rng.uniform(0, 30 * 86400))
+
+    user_rows = [{"id": i, "username": f"bench_user_{i}", "password": password} for i in range(1, users + 1)]
+    post_rows = [
+        {
+            "id": i,
+            "title": f"Benchmark post {i}",
+            "content": f"Seeded content for post {i} " * rng.randint(1, 20),
+            "author_id": rng.randint(1, users),
+            "created_at": moment(),
+        }
+        for i in range(1, posts + 1)
+    ]
+    comment_rows = [
+        {
+            "post_id": rng.randint(1, posts),
+            "author_id": rng.randint(1, users),
+            "content": f"Seeded comment {i}",
+            "created_at": moment(),
+        }
+        for i in range(comments)
+    ]
+    like_pairs = set()
+    while len(like_pairs) < min(likes, users * posts):
+        like_pairs.add((rng.randint(1, posts), rng.randint(1, users)))
+    like_rows = [{"post_id": p, "user_id": u, "created_at": moment()} for p, u in like_pairs]
+
+    async with engine.begin() as conn:
+        await _insert_chunked(conn, User.__table__, user_rows)
+        await _insert_chunked(conn, Post.__table__, post_rows)
+        await _insert_chunked(conn, Comment.__table__, comment_rows)
+        await _insert_chunked(conn, Like.__table__, like_rows)
+        await conn.execute(reconcile_counts())
+        await conn.run_sync(backfill_user_stats)
+
+    tokens = {
+        row["id"]: create_access_token({"sub": str(row["id"]), "username": row["username"]}, timedelta(hours=6))
+        for row in user_rows
+    }
+    return {"users": users, "posts": posts, "tokens": tokens, "password": BENCH_PASSWORD}
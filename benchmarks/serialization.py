@@ -0,0 +1,93 @@
+"""Measure the CPU cost of encoding feed responses, with and without FAST_JSON.
+
+    python -m benchmarks.serialization --posts 1000 --rounds 200
+
+Compares FastAPI's default path (response_model validation through PostOut,
+then JSONResponse) with the pre-shaped rows encoded by src.responses, using
+the stdlib encoder and orjson when it is installed.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_posts(count: int) -> List[dict]:
+    started = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "title": f"Post number {i}",
+            "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+            "author_id": i % 97 + 1,
+            "author_username": f"user_{i % 97 + 1}",
+            "created_at": (started + timedelta(seconds=i)).isoformat(),
+            "like_count": i % 13,
+            "comment_count": i % 7,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def cpu_ms_per_call(fn: Callable[[], bytes], rounds: int) -> float:
+    fn()
+    started = time.process_time()
+    for _ in range(rounds):
+        fn()
+    return (time.process_time() - started) / rounds * 1000
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSON response encoding")
+    parser.add_argument("--posts", type=int, default=1000, help="posts per response")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args(argv)
+    sys.path.insert(0, REPO_ROOT)
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from src import responses
+    from src.schemas import PostOut
+
+    posts = make_posts(args.posts)
+    field = create_response_field(name="response", type_=List[PostOut])
+    loop = asyncio.new_event_loop()
+
+    def default_path() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=posts))
+        return JSONResponse(content).body
+
+    def fast_path(use_orjson: bool) -> Callable[[], bytes]:
+        def encode() -> bytes:
+            responses.FAST_JSON = use_orjson
+            return responses.FastJSONResponse(posts).body
+        return encode
+
+    baseline = default_path()
+    cases = [("response_model + JSONResponse", default_path), ("FAST_JSON, stdlib json", fast_path(False))]
+    if responses.orjson is not None:
+        cases.append(("FAST_JSON, orjson", fast_path(True)))
+    else:
+        print("orjson is not installed; skipping the orjson case")
+
+    print(f"{args.posts} posts per response, {args.rounds} rounds, {len(baseline)} bytes")
+    reference = None
+    for name, fn in cases:
+        if fn() != baseline:
+            raise SystemExit(f"{name} produced different bytes than the default path")
+        ms = cpu_ms_per_call(fn, args.rounds)
+        reference = reference or ms
+        print(f"{name:<32}{ms:>10.3f} ms CPU{reference / ms:>8.1f}x")
+    loop.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
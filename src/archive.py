@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy import select, insert, delete
+from dotenv import load_dotenv
+import os
+
+from .cache import LRUCache
+from .models import ArchivedComment, ArchivedLike, ArchivedPost, Comment, Like, Post, TimelineEntry, User
+from .queries import serialize_post
+
+load_dotenv()
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_CACHE_SIZE = int(os.getenv("ARCHIVE_CACHE_SIZE", "10000"))
+
+# Archived posts never change, so entries only leave the cache when it is full
+archive_cache = LRUCache(ARCHIVE_CACHE_SIZE)
+
+# (live table, archive table) in copy order; children are deleted in reverse
+TIERS = [
+    (Post.__table__, ArchivedPost.__table__),
+    (Comment.__table__, ArchivedComment.__table__),
+    (Like.__table__, ArchivedLike.__table__),
+]
+
+
+def archive_cutoff(days: int = ARCHIVE_AFTER_DAYS) -> datetime:
+    return datetime.utcnow() - timedelta(days=days)
+
+
+# Move the oldest `batch_size` posts created before `cutoff`, with their comments and
+# likes, into the archive tables. Meant to run in its own short transaction.
+async def archive_batch(conn: AsyncConnection, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> List[int]:
+    q = await conn.execute(
+        select(Post.id).where(Post.created_at < cutoff).order_by(Post.created_at, Post.id).limit(batch_size)
+    )
+    post_ids = q.scalars().all()
+    if not post_ids:
+        return post_ids
+    for live, archived in TIERS:
+        key = live.c.id if live is Post.__table__ else live.c.post_id
+        columns = [column.name for column in live.columns]
+        await conn.execute(
+            insert(archived).from_select(columns, select(*[live.c[name] for name in columns]).where(key.in_(post_ids)))
+        )
+    await conn.execute(delete(TimelineEntry).where(TimelineEntry.post_id.in_(post_ids)))
+    await conn.execute(delete(Like).where(Like.post_id.in_(post_ids)))
+    await conn.execute(delete(Comment).where(Comment.post_id.in_(post_ids)))
+    await conn.execute(delete(Post).where(Post.id.in_(post_ids)))
+    return post_ids
+
+
+def archived_post_query():
+    return (
+        select(
+            ArchivedPost.id,
+            ArchivedPost.title,
+            ArchivedPost.content,
+            ArchivedPost.author_id,
+            User.username.label("author_username"),
+            ArchivedPost.created_at,
+            ArchivedPost.like_count,
+            ArchivedPost.comment_count,
+        )
+        .join(User, User.id == ArchivedPost.author_id)
+    )
+
+
+def archived_comments_query(post_id: int):
+    return (
+        select(
+            ArchivedComment.id,
+            ArchivedComment.post_id,
+            ArchivedComment.author_id,
+            User.username.label("author_username"),
+            ArchivedComment.content,
+            ArchivedComment.created_at,
+        )
+        .join(User, User.id == ArchivedComment.author_id)
+        .where(ArchivedComment.post_id == post_id)
+    )
+
+
+# Read-through lookup used when a post is missing from the live table
+async def fetch_archived_post(db: AsyncSession, post_id: int) -> Optional[dict]:
+    key = ("archived_post", post_id)
+    post = archive_cache.get(key)
+    if post is None:
+        q = await db.execute(archived_post_query().where(ArchivedPost.id == post_id))
+        row = q.first()
+        if row is None:
+            return None
+        post = serialize_post(row)
+        archive_cache.set(key, post)
+    return post
+
+
+async def is_archived(db: AsyncSession, post_id: int) -> bool:
+    if archive_cache.get(("archived_post", post_id)) is not None:
+        return True
+    q = await db.execute(select(ArchivedPost.id).where(ArchivedPost.id == post_id))
+    return q.first() is not None
@@ -0,0 +1,102 @@
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple, Type
+from dotenv import load_dotenv
+import json
+import os
+
+from .database import engine
+
+load_dotenv()
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "100000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+Chunk = List[Tuple[int, BaseModel]]
+
+
+def item_result(index: int, item_id=None, error=None) -> dict:
+    return {"index": index, "id": item_id, "error": error}
+
+
+# Insert `rows` with one multi-row INSERT and return their ids in row order. PostgreSQL
+# reports them through RETURNING; elsewhere a single statement takes consecutive
+# auto-increment ids and the driver's lastrowid is the first (MySQL) or last (SQLite).
+async def insert_returning_ids(db: AsyncSession, table, rows: List[dict]) -> List[int]:
+    stmt = insert(table).values(rows)
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        result = await db.execute(stmt.returning(table.c.id))
+        return sorted(result.scalars().all())
+    result = await db.execute(stmt)
+    first = result.lastrowid if dialect == "mysql" else result.lastrowid - len(rows) + 1
+    return list(range(first, first + len(rows)))
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors())
+
+
+# Items come either as a JSON array or as NDJSON (one object per line), which is read incrementally
+async def read_items(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    # checked up front so an oversized array is rejected before anything is committed
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+    for index, item in enumerate(items):
+        yield index, item
+
+
+async def run_bulk(
+    request: Request,
+    model: Type[BaseModel],
+    insert_chunk: Callable[[Chunk], Awaitable[List[dict]]],
+) -> dict:
+    results: List[dict] = []
+    chunk: Chunk = []
+    truncated = False
+    items = read_items(request)
+    async for index, raw in items:
+        if index >= BULK_MAX_ITEMS:
+            # NDJSON is only counted as it streams in and earlier chunks are already
+            # committed, so stop here and report it rather than failing the request
+            truncated = True
+            await items.aclose()
+            break
+        try:
+            if isinstance(raw, bytes):
+                raw = json.loads(raw)
+            chunk.append((index, model.parse_obj(raw)))
+        except ValidationError as exc:
+            results.append(item_result(index, error=_validation_message(exc)))
+        except ValueError:
+            results.append(item_result(index, error="Invalid JSON"))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            results.extend(await insert_chunk(chunk))
+            chunk = []
+    if chunk:
+        results.extend(await insert_chunk(chunk))
+    results.sort(key=lambda r: r["index"])
+    failed = sum(1 for r in results if r["error"])
+    return {"created": len(results) - failed, "failed": failed, "truncated": truncated, "results": results}
@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import time
+
+
+class CacheBackend(ABC):
+    """Key/value cache interface. Shared backends (e.g. Redis) implement the same four methods."""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a default TTL; a non-positive max_size disables caching."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
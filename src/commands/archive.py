@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+
+from ..archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_batch, archive_cutoff
+from ..database import engine
+
+
+# Move posts older than `days` (with their comments and likes) into the archive tables.
+# Each batch is copied and deleted in its own short transaction, with an optional pause
+# between batches so replicas and live writers keep up.
+async def archive(days: int, batch_size: int, pause: float, max_batches: int) -> int:
+    cutoff = archive_cutoff(days)
+    moved = 0
+    batches = 0
+    while not max_batches or batches < max_batches:
+        async with engine.begin() as conn:
+            post_ids = await archive_batch(conn, cutoff, batch_size)
+        if not post_ids:
+            break
+        moved += len(post_ids)
+        batches += 1
+        if pause:
+            await asyncio.sleep(pause)
+    return moved
+
+
+async def run(days: int, batch_size: int, pause: float, max_batches: int) -> int:
+    try:
+        return await archive(days, batch_size, pause, max_batches)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old posts, comments and likes into the archive tables")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive posts older than this")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="posts per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=0, help="stop after this many batches (0 = no limit)")
+    args = parser.parse_args()
+    moved = asyncio.run(run(args.days, args.batch_size, args.pause, args.max_batches))
+    print(f"Archived {moved} posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+
+from ..counters import backfill_user_stats
+from ..database import engine
+
+
+# Rebuild user_stats from posts, comments and likes: one grouped scan per source table,
+# written back in a single transaction so readers never see a half-filled table.
+async def backfill(batch_size: int) -> int:
+    async with engine.begin() as conn:
+        return await conn.run_sync(backfill_user_stats, batch_size)
+
+
+async def run(batch_size: int) -> int:
+    try:
+        return await backfill(batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute per-user activity stats")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per executemany write")
+    args = parser.parse_args()
+    users = asyncio.run(run(args.batch_size))
+    print(f"Backfilled stats for {users} users")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+
+from ..database import engine
+from ..migrations import migrate, pending_migrations
+
+
+async def run(status_only: bool) -> None:
+    try:
+        if status_only:
+            pending = await pending_migrations()
+            if not pending:
+                print("Schema is up to date")
+            for migration in pending:
+                print(f"pending: {migration.version} {migration.name}")
+            return
+        applied = await migrate()
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="list pending migrations without applying them")
+    args = parser.parse_args()
+    asyncio.run(run(args.status))
+
+
+if __name__ == "__main__":
+    main()
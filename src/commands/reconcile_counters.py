@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+from sqlalchemy import select, func
+
+from ..counters import reconcile_counts
+from ..database import engine
+from ..models import Post
+
+
+# Recompute posts.like_count / posts.comment_count from the likes and comments tables.
+# Each id range is repaired in its own short transaction so live traffic is not blocked.
+async def reconcile(batch_size: int) -> int:
+    async with engine.connect() as conn:
+        q = await conn.execute(select(func.min(Post.id), func.max(Post.id)))
+        low, high = q.one()
+    if low is None:
+        return 0
+    repaired = 0
+    for start in range(low, high + 1, batch_size):
+        async with engine.begin() as conn:
+            result = await conn.execute(reconcile_counts(Post.id.between(start, start + batch_size - 1)))
+            repaired += result.rowcount
+    return repaired
+
+
+async def run(batch_size: int) -> int:
+    try:
+        return await reconcile(batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repair denormalized like/comment counters on posts")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    repaired = asyncio.run(run(args.batch_size))
+    print(f"Reconciled counters on {repaired} posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+from sqlalchemy import select, delete, func, and_, or_
+
+from ..database import engine
+from ..models import TimelineEntry
+from ..timeline import TIMELINE_MAX_ENTRIES
+
+
+# Cut every home timeline down to its newest `max_entries` posts. Users are
+# processed in id ranges, each in its own short transaction.
+async def trim(max_entries: int, batch_size: int) -> int:
+    async with engine.connect() as conn:
+        q = await conn.execute(select(func.min(TimelineEntry.user_id), func.max(TimelineEntry.user_id)))
+        low, high = q.one()
+    if low is None:
+        return 0
+    removed = 0
+    for start in range(low, high + 1, batch_size):
+        async with engine.begin() as conn:
+            q = await conn.execute(
+                select(TimelineEntry.user_id)
+                .where(TimelineEntry.user_id.between(start, start + batch_size - 1))
+                .group_by(TimelineEntry.user_id)
+                .having(func.count() > max_entries)
+            )
+            for user_id in q.scalars().all():
+                # the newest entry that falls outside the kept window
+                q = await conn.execute(
+                    select(TimelineEntry.created_at, TimelineEntry.post_id)
+                    .where(TimelineEntry.user_id == user_id)
+                    .order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+                    .offset(max_entries)
+                    .limit(1)
+                )
+                created_at, post_id = q.one()
+                result = await conn.execute(
+                    delete(TimelineEntry).where(
+                        TimelineEntry.user_id == user_id,
+                        or_(
+                            TimelineEntry.created_at < created_at,
+                            and_(TimelineEntry.created_at == created_at, TimelineEntry.post_id <= post_id),
+                        ),
+                    )
+                )
+                removed += result.rowcount
+    return removed
+
+
+async def run(max_entries: int, batch_size: int) -> int:
+    try:
+        return await trim(max_entries, batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trim home timelines to their newest entries")
+    parser.add_argument("--max-entries", type=int, default=TIMELINE_MAX_ENTRIES)
+    parser.add_argument("--batch-size", type=int, default=1000, help="users per transaction")
+    args = parser.parse_args()
+    removed = asyncio.run(run(args.max_entries, args.batch_size))
+    print(f"Removed {removed} timeline entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,41 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, AsyncGenerator
+from typing import Optional, AsyncGenerator, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
 
-from .database import get_db_session as get_db
+from .cache import CacheBackend, LRUCache
+from .database import get_db_session as get_db, get_read_db_session as get_read_db
 from .models import User
 from dotenv import load_dotenv
+import asyncio
+import hashlib
 import os
+import time
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# PEM files for RS*/ES* algorithms; API workers that only verify tokens need just the public key
+JWT_PRIVATE_KEY = os.getenv("JWT_PRIVATE_KEY")
+JWT_PUBLIC_KEY = os.getenv("JWT_PUBLIC_KEY")
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+# hashes whose cost differs from BCRYPT_ROUNDS are flagged for rehash on next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
@@ -31,6 +48,75 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt runs on a bounded worker pool so it never blocks the event loop
+class PasswordHasher:
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwd-hash")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await password_hasher.run(verify_and_update_password, plain_password, hashed_password)
+
+
+# JWT keys are parsed once at startup; HS* algorithms sign and verify with SECRET_KEY
+def _load_key(path: Optional[str]):
+    if not path:
+        return None
+    with open(path) as fh:
+        return jwk.construct(fh.read(), ALGORITHM)
+
+
+if not ALGORITHM or ALGORITHM.startswith("HS"):
+    signing_key = verification_key = SECRET_KEY
+else:
+    signing_key = _load_key(JWT_PRIVATE_KEY)
+    verification_key = _load_key(JWT_PUBLIC_KEY) or signing_key
+    # fail at startup rather than answering 401 to every request
+    if verification_key is None:
+        raise RuntimeError(f"JWT_PUBLIC_KEY or JWT_PRIVATE_KEY is required to verify {ALGORITHM} tokens")
+
+
 # JWT helpers
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -39,7 +125,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if signing_key is None:
+        raise RuntimeError(f"JWT_PRIVATE_KEY is required to issue {ALGORITHM} tokens")
+    encoded_jwt = jwt.encode(to_encode, signing_key, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -54,22 +142,73 @@ async def get_user_by_id(db: AsyncSession, user_id: int):
     return q.scalars().first()
 
 
+# Authenticated-user cache, keyed by user id
+user_cache: CacheBackend = LRUCache(max_size=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def cache_user(user: User) -> None:
+    user_cache.set(("user", user.id), {"id": user.id, "username": user.username})
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete(("user", user_id))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
 # current user from token
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+# Verified tokens, keyed by their SHA-256 and kept until the token's own expiry
+token_cache: CacheBackend = LRUCache(max_size=TOKEN_CACHE_MAX_SIZE)
+
+
+def decode_access_token(token: str) -> dict:
+    cache_key = ("token", hashlib.sha256(token.encode()).digest())
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, verification_key, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-        user_id = int(user_id)
+            raise _credentials_exception()
+        payload["sub"] = int(user_id)
     except (JWTError, ValueError):
-        raise credentials_exception
+        raise _credentials_exception()
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.set(cache_key, payload, ttl=remaining)
+    return payload
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    user_id = decode_access_token(token)["sub"]
+    cached = user_cache.get(("user", user_id))
+    if cached is not None:
+        return User(**cached)
     user = await get_user_by_id(db, user_id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    cache_user(user)
     return user
+
+
+# For read-only paths: with AUTH_TRUST_TOKEN_CLAIMS on, build the user from the
+# signed `sub`/`username` claims without touching the cache or the database.
+async def get_token_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        payload = decode_access_token(token)
+        if payload.get("username"):
+            return User(id=payload["sub"], username=payload["username"])
+    return await get_current_user(token, db)
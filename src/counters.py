@@ -0,0 +1,113 @@
+from collections import defaultdict
+from sqlalchemy import select, update, insert, inspect, func, or_, bindparam
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from .database import engine
+from .models import ArchivedComment, ArchivedLike, ArchivedPost, Post, Like, Comment, User, UserStats
+
+USER_STAT_COLUMNS = ("post_count", "comment_count", "likes_given", "likes_received")
+
+
+# Counter bumps run in the same transaction as the like/comment row they describe
+def bump_like_count(post_id: int, delta: int = 1):
+    return update(Post).where(Post.id == post_id).values(like_count=Post.like_count + delta)
+
+
+def bump_comment_count(post_id: int, delta: int = 1):
+    return update(Post).where(Post.id == post_id).values(comment_count=Post.comment_count + delta)
+
+
+def bump_follower_count(user_id: int, delta: int = 1):
+    return update(User).where(User.id == user_id).values(follower_count=User.follower_count + delta)
+
+
+# executemany forms for batched writes: params are {"b_post_id": ..., "b_delta": ...}
+def bump_like_counts():
+    posts = Post.__table__
+    return (
+        update(posts)
+        .where(posts.c.id == bindparam("b_post_id"))
+        .values(like_count=posts.c.like_count + bindparam("b_delta"))
+    )
+
+
+def bump_comment_counts():
+    posts = Post.__table__
+    return (
+        update(posts)
+        .where(posts.c.id == bindparam("b_post_id"))
+        .values(comment_count=posts.c.comment_count + bindparam("b_delta"))
+    )
+
+
+def reconcile_counts(*criteria):
+    like_total = select(func.count(Like.id)).where(Like.post_id == Post.id).scalar_subquery()
+    comment_total = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+    return (
+        update(Post)
+        .where(*criteria)
+        .where(or_(Post.like_count != like_total, Post.comment_count != comment_total))
+        .values(like_count=like_total, comment_count=comment_total)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# user_stats bumps, e.g. bump_user_stats(author_id, post_count=1). An upsert, so a user
+# whose row is missing gets one (fixed up by backfill_user_stats) instead of losing the bump.
+def bump_user_stats(user_id: int, **deltas: int):
+    stats = UserStats.__table__
+    increments = {name: stats.c[name] + delta for name, delta in deltas.items()}
+    dialect = engine.dialect.name
+    if dialect == "mysql":
+        return mysql.insert(stats).values(user_id=user_id, **deltas).on_duplicate_key_update(increments)
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql if dialect == "postgresql" else sqlite).insert(stats).values(user_id=user_id, **deltas)
+        return upsert.on_conflict_do_update(index_elements=[stats.c.user_id], set_=increments)
+    return update(stats).where(stats.c.user_id == user_id).values(increments)
+
+
+# executemany form: params are {"b_user_id": ..., "b_delta": ...}
+def bump_user_stats_many(column: str):
+    stats = UserStats.__table__
+    return (
+        update(stats)
+        .where(stats.c.user_id == bindparam("b_user_id"))
+        .values({column: stats.c[column] + bindparam("b_delta")})
+    )
+
+
+# Rebuild user_stats from scratch on a sync connection: one GROUP BY pass over each
+# source table, then one executemany write per user. Runs in the caller's transaction.
+def backfill_user_stats(conn, batch_size: int = 1000) -> int:
+    totals = defaultdict(lambda: dict.fromkeys(USER_STAT_COLUMNS, 0))
+    passes = [
+        ("post_count", select(Post.author_id, func.count()).group_by(Post.author_id)),
+        ("comment_count", select(Comment.author_id, func.count()).group_by(Comment.author_id)),
+        ("likes_given", select(Like.user_id, func.count()).group_by(Like.user_id)),
+        ("likes_received", select(Post.author_id, func.count()).select_from(Like).join(Post, Post.id == Like.post_id).group_by(Post.author_id)),
+    ]
+    # archived rows still count towards their users' totals (the tables exist from migration 8 on)
+    if inspect(conn).has_table(ArchivedPost.__tablename__):
+        passes += [
+            ("post_count", select(ArchivedPost.author_id, func.count()).group_by(ArchivedPost.author_id)),
+            ("comment_count", select(ArchivedComment.author_id, func.count()).group_by(ArchivedComment.author_id)),
+            ("likes_given", select(ArchivedLike.user_id, func.count()).group_by(ArchivedLike.user_id)),
+            ("likes_received", select(ArchivedPost.author_id, func.sum(ArchivedPost.like_count)).group_by(ArchivedPost.author_id)),
+        ]
+    for column, stmt in passes:
+        for user_id, total in conn.execute(stmt):
+            totals[user_id][column] += total or 0
+
+    stats = UserStats.__table__
+    existing = set(conn.execute(select(stats.c.user_id)).scalars())
+    user_ids = conn.execute(select(User.id)).scalars().all()
+    missing = [{"user_id": user_id} for user_id in user_ids if user_id not in existing]
+    for start in range(0, len(missing), batch_size):
+        conn.execute(insert(stats), missing[start:start + batch_size])
+    rows = [{"b_user_id": user_id, **{f"b_{c}": totals[user_id][c] for c in USER_STAT_COLUMNS}} for user_id in user_ids]
+    write = update(stats).where(stats.c.user_id == bindparam("b_user_id")).values(
+        {c: bindparam(f"b_{c}") for c in USER_STAT_COLUMNS}
+    )
+    for start in range(0, len(rows), batch_size):
+        conn.execute(write, rows[start:start + batch_size])
+    return len(rows)
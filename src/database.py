@@ -1,14 +1,23 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy import MetaData, text
 from dotenv import load_dotenv
 import os
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, Optional
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./database.db")
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+REPLICA_LAG_SECONDS = float(os.getenv("REPLICA_LAG_SECONDS", "2"))
 MYSQL_CHARSET = os.getenv("MYSQL_CHARSET", "utf8mb4")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
 metadata = MetaData(naming_convention={
     "ix": "ix_%(column_0_label)s",
@@ -19,21 +28,108 @@ metadata = MetaData(naming_convention={
 })
 
 
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo=True,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_timeout=30,
-    connect_args={
-        "init_command": "SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci"
-    } if "mysql" in DATABASE_URL else {}
-)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that counts connection checkouts and records how long callers wait for them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.checkout_count += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": DB_ECHO, "pool_pre_ping": True}
+    # SQLite runs on NullPool, which takes no sizing options
+    if url.startswith("sqlite"):
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if "mysql" in url:
+        options["connect_args"] = {"init_command": "SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci"}
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+read_engine = create_async_engine(READ_REPLICA_URL, **_engine_options(READ_REPLICA_URL)) if READ_REPLICA_URL else engine
 
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base(metadata=metadata)
 
 
+class LazySession:
+    """Stands in for an AsyncSession and only creates it when first used."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
+    session = LazySession(SessionLocal)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# GET handlers read from the replica when READ_REPLICA_URL is set
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    session = LazySession(ReadSessionLocal)
+    try:
         yield session
+    finally:
+        await session.close()
+
+
+def pool_stats(db_engine) -> dict:
+    pool = db_engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    stats = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, TimedQueuePool):
+        stats.update(
+            checkout_count=pool.checkout_count,
+            wait_seconds_total=round(pool.wait_seconds_total, 6),
+            wait_seconds_max=round(pool.wait_seconds_max, 6),
+        )
+    return stats
+
+
+def all_pool_stats() -> dict:
+    stats = {"primary": pool_stats(engine)}
+    if read_engine is not engine:
+        stats["replica"] = pool_stats(read_engine)
+    return stats
@@ -0,0 +1,52 @@
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Callable, List
+from dotenv import load_dotenv
+import csv
+import io
+import json
+import os
+
+from .database import ReadSessionLocal
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+# Rows come from a server-side cursor in fixed-size partitions, so memory stays
+# flat no matter how large the table is. The export opens its own session because
+# the body is produced after the endpoint has returned.
+async def _stream_batches(stmt, serialize: Callable) -> AsyncIterator[List[dict]]:
+    async with ReadSessionLocal() as session:
+        result = await session.stream(stmt)
+        async for partition in result.partitions(EXPORT_BATCH_SIZE):
+            yield [serialize(row) for row in partition]
+
+
+async def _ndjson(stmt, serialize: Callable) -> AsyncIterator[str]:
+    async for batch in _stream_batches(stmt, serialize):
+        yield "".join(json.dumps(item) + "\n" for item in batch)
+
+
+async def _csv(stmt, serialize: Callable, fields: List[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    async for batch in _stream_batches(stmt, serialize):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(stmt, serialize: Callable, fields: List[str], fmt: str, name: str) -> StreamingResponse:
+    body = _csv(stmt, serialize, fields) if fmt == "csv" else _ndjson(stmt, serialize)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
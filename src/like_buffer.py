@@ -0,0 +1,192 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+import time
+
+from .counters import bump_like_counts, bump_user_stats_many
+from .database import SessionLocal, engine
+from .models import Post, Like
+from .realtime import hub
+from .response_cache import invalidate_post
+
+load_dotenv()
+
+LIKE_BUFFER_ENABLED = os.getenv("LIKE_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+LIKE_BUFFER_MAX_BATCH = int(os.getenv("LIKE_BUFFER_MAX_BATCH", "500"))
+LIKE_BUFFER_FLUSH_INTERVAL_MS = int(os.getenv("LIKE_BUFFER_FLUSH_INTERVAL_MS", "200"))
+LIKE_BUFFER_MAX_PENDING = int(os.getenv("LIKE_BUFFER_MAX_PENDING", "20000"))
+
+logger = logging.getLogger(__name__)
+
+
+def insert_ignore(table):
+    dialect = engine.dialect.name
+    if dialect == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+class LikeBufferFull(Exception):
+    """max_pending likes are waiting and flushing them failed."""
+
+
+class LikeBuffer:
+    """Accepts likes in memory and writes them in multi-row batches.
+
+    Pending likes are deduplicated by (post_id, user_id). A background task
+    flushes every flush_interval seconds, or sooner once max_batch likes are
+    waiting; add() blocks on a flush when max_pending is reached, and raises
+    LikeBufferFull if the buffer is still full afterwards (e.g. the DB is down).
+    """
+
+    def __init__(self, max_batch: int, flush_interval: float, max_pending: int):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[int, int], datetime] = {}
+        # created on first use so they bind to the server's event loop
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_total = 0
+        self.inserted_total = 0
+        self.dropped_total = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def is_pending(self, post_id: int, user_id: int) -> bool:
+        return (post_id, user_id) in self._pending
+
+    async def add(self, post_id: int, user_id: int) -> bool:
+        if self.is_pending(post_id, user_id):
+            return False
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+            if len(self._pending) >= self.max_pending:
+                raise LikeBufferFull()
+        self._pending[(post_id, user_id)] = datetime.utcnow()
+        if len(self._pending) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> None:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            while self._pending:
+                keys = list(self._pending)[: self.max_batch]
+                batch = [(key, self._pending.pop(key)) for key in keys]
+                started = time.perf_counter()
+                # a failed batch rolls back whole and pairs already stored are skipped, so it is simply retried
+                try:
+                    await self._write(batch)
+                except asyncio.CancelledError:
+                    self._requeue(batch)
+                    raise
+                except Exception:
+                    self.flush_errors += 1
+                    logger.exception("Flushing %d buffered likes failed; requeued", len(batch))
+                    self._requeue(batch)
+                    return
+                finally:
+                    self.last_flush_seconds = time.perf_counter() - started
+                    self.flush_seconds_total += self.last_flush_seconds
+                    self.flush_count += 1
+
+    def _requeue(self, batch) -> None:
+        for key, created_at in batch:
+            self._pending.setdefault(key, created_at)
+
+    async def _write(self, batch: List[Tuple[Tuple[int, int], datetime]]) -> None:
+        post_ids = {post_id for (post_id, _), _ in batch}
+        user_ids = {user_id for (_, user_id), _ in batch}
+        async with SessionLocal() as db:
+            q = await db.execute(select(Post.id, Post.author_id).where(Post.id.in_(post_ids)))
+            authors = dict(q.all())
+            q = await db.execute(select(Like.post_id, Like.user_id).where(Like.post_id.in_(authors), Like.user_id.in_(user_ids)))
+            existing = set(q.all())
+            live = [(key, created_at) for key, created_at in batch if key[0] in authors]
+            rows = [
+                {"post_id": post_id, "user_id": user_id, "created_at": created_at}
+                for (post_id, user_id), created_at in live
+                if (post_id, user_id) not in existing
+            ]
+            liked = Counter(row["post_id"] for row in rows)
+            if rows:
+                # counters move by what this batch added; a pair inserted concurrently by another
+                # worker's buffer is skipped by the insert but still counted here, which the
+                # reconcile_counters and backfill_user_stats commands repair
+                await db.execute(insert_ignore(Like.__table__), rows)
+                await db.execute(bump_like_counts(), [{"b_post_id": k, "b_delta": n} for k, n in liked.items()])
+                for column, users in (
+                    ("likes_given", Counter(row["user_id"] for row in rows)),
+                    ("likes_received", Counter(authors[row["post_id"]] for row in rows)),
+                ):
+                    await db.execute(bump_user_stats_many(column), [{"b_user_id": k, "b_delta": n} for k, n in users.items()])
+            await db.commit()
+        self.flushed_total += len(live)
+        self.inserted_total += len(rows)
+        self.dropped_total += len(batch) - len(live)
+        for post_id in liked:
+            invalidate_post(post_id)
+        if liked:
+            hub.counters_changed(liked)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "flushed_total": self.flushed_total,
+            "inserted_total": self.inserted_total,
+            "dropped_total": self.dropped_total,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "flush_seconds_total": round(self.flush_seconds_total, 6),
+            "last_flush_seconds": round(self.last_flush_seconds, 6),
+        }
+
+
+like_buffer = LikeBuffer(
+    max_batch=LIKE_BUFFER_MAX_BATCH,
+    flush_interval=LIKE_BUFFER_FLUSH_INTERVAL_MS / 1000,
+    max_pending=LIKE_BUFFER_MAX_PENDING,
+)
@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional, Set
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+import asyncio
+import os
+
+from .archive import archived_post_query
+from .database import get_read_db_session
+from .models import ArchivedPost, Post
+from .queries import fetch_posts, post_feed_query
+
+load_dotenv()
+
+LOADER_MAX_BATCH = int(os.getenv("LOADER_MAX_BATCH", "500"))
+
+
+class PostLoader:
+    """Per-request batcher for post lookups, in the style of DataLoader.
+
+    load() calls made in the same event-loop tick are resolved together with one
+    IN (...) query per LOADER_MAX_BATCH ids; repeated ids share one result. Ids
+    missing from the live table are looked up in the archive with one more query.
+    """
+
+    def __init__(self, db: AsyncSession, max_batch: int = LOADER_MAX_BATCH):
+        self.db = db
+        self.max_batch = max_batch
+        self._results: Dict[int, asyncio.Future] = {}
+        self._queue: List[int] = []
+        # the session runs one statement at a time
+        self._lock = asyncio.Lock()
+        # the event loop only keeps weak references to running tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, post_id: int) -> "asyncio.Future[Optional[dict]]":
+        future = self._results.get(post_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[post_id] = loop.create_future()
+            self._queue.append(post_id)
+            if len(self._queue) == 1:
+                loop.call_soon(self._schedule)
+        return future
+
+    def _schedule(self) -> None:
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def load_many(self, post_ids: List[int]) -> List[Optional[dict]]:
+        return list(await asyncio.gather(*[self.load(post_id) for post_id in post_ids]))
+
+    async def _fetch(self, post_ids: List[int]) -> Dict[int, dict]:
+        found = {post["id"]: post for post in await fetch_posts(self.db, post_feed_query().where(Post.id.in_(post_ids)))}
+        missing = [post_id for post_id in post_ids if post_id not in found]
+        if missing:
+            archived = await fetch_posts(self.db, archived_post_query().where(ArchivedPost.id.in_(missing)))
+            found.update((post["id"], post) for post in archived)
+        return found
+
+    async def _dispatch(self) -> None:
+        post_ids, self._queue = self._queue, []
+        try:
+            async with self._lock:
+                for start in range(0, len(post_ids), self.max_batch):
+                    chunk = post_ids[start:start + self.max_batch]
+                    try:
+                        found = await self._fetch(chunk)
+                    except Exception as exc:
+                        for post_id in chunk:
+                            self._results.pop(post_id).set_exception(exc)
+                        continue
+                    for post_id in chunk:
+                        self._results[post_id].set_result(found.get(post_id))
+        finally:
+            # a cancelled dispatch must not leave its callers waiting
+            for post_id in post_ids:
+                future = self._results.get(post_id)
+                if future is not None and not future.done():
+                    self._results.pop(post_id).cancel()
+
+
+async def get_post_loader(db: AsyncSession = Depends(get_read_db_session)) -> PostLoader:
+    return PostLoader(db)
@@ -1,9 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from src.database import engine, Base
-from src.routes import posts, auth, like, comments
+from src.controllers import password_hasher
+from src.database import engine, read_engine, all_pool_stats
+from src.like_buffer import LIKE_BUFFER_ENABLED, like_buffer
+from src.metrics import MetricsMiddleware, instrument_engine, registry
+from src.ranking import RANKING_ENABLED, ranking
+from src.ratelimit import LOAD_SHED_ENABLED, RATE_LIMIT_ENABLED, RateLimitMiddleware
+from src import ratelimit
+from src.migrations import AUTO_MIGRATE, migrate, pending_migrations
+from src.realtime import hub
+from src.routes import posts, auth, like, comments, users, timeline, realtime
 from src.models import User, Post, Comment, Like  # Import models explicitly
-from sqlalchemy import text
 from dotenv import load_dotenv
 import os
 
@@ -14,90 +21,91 @@ PORT = int(os.getenv("PORT"))
 
 app = FastAPI()
 
+# innermost, so rejections still get CORS headers and are counted by MetricsMiddleware
+app.add_middleware(RateLimitMiddleware, routes=app.routes)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],       
     allow_credentials=True,
     allow_methods=["*"],       
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(read_engine)
 
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        try:
-            await conn.execute(text("SET FOREIGN_KEY_CHECKS=0"))
-            
-            await conn.execute(text("DROP TABLE IF EXISTS likes"))
-            await conn.execute(text("DROP TABLE IF EXISTS comments"))
-            await conn.execute(text("DROP TABLE IF EXISTS posts"))
-            await conn.execute(text("DROP TABLE IF EXISTS users"))
-            
-            await conn.execute(text("SET FOREIGN_KEY_CHECKS=1"))
-            
-            await conn.execute(text('''
-                CREATE TABLE users (
-                    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(150) NOT NULL UNIQUE,
-                    password VARCHAR(255) NOT NULL,
-                    INDEX (username)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            '''))
-            
-            await conn.execute(text('''
-                CREATE TABLE posts (
-                    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-                    title VARCHAR(255) NOT NULL,
-                    content TEXT NOT NULL,
-                    author_id INT NOT NULL,
-                    created_at DATETIME,
-                    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            '''))
-            
-            await conn.execute(text('''
-                CREATE TABLE comments (
-                    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-                    post_id INT NOT NULL,
-                    author_id INT NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at DATETIME,
-                    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-                    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            '''))
-            
-            await conn.execute(text('''
-                CREATE TABLE likes (
-                    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-                    post_id INT NOT NULL,
-                    user_id INT NOT NULL,
-                    created_at DATETIME,
-                    UNIQUE KEY uix_post_user (post_id, user_id),
-                    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            '''))
-            
-            print("Tables created successfully using raw SQL")
-        except Exception as e:
-            print(f"Error creating tables with raw SQL: {e}")
-            try:
-                await conn.run_sync(Base.metadata.create_all)
-                print("Tables created successfully using SQLAlchemy")
-            except Exception as e2:
-                print(f"Error creating tables with SQLAlchemy: {e2}")
+    # schema changes are versioned migrations; when the schema is current this is one lookup
+    if AUTO_MIGRATE:
+        applied = await migrate()
+        if applied:
+            print(f"Applied schema migrations: {applied}")
+    else:
+        pending = await pending_migrations()
+        if pending:
+            print(f"Schema is behind by {len(pending)} migration(s); run python -m src.commands.migrate")
+    if LIKE_BUFFER_ENABLED:
+        like_buffer.start()
+    if RANKING_ENABLED:
+        ranking.start()
+    await hub.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if LIKE_BUFFER_ENABLED:
+        await like_buffer.stop()
+    if RANKING_ENABLED:
+        await ranking.stop()
+    await hub.stop()
+    password_hasher.shutdown()
 
 app.include_router(auth.router)
+# comments first: GET /api/posts/comments must not be captured by GET /api/posts/{post_id}
+app.include_router(comments.router)
 app.include_router(posts.router)
 app.include_router(like.router)
-app.include_router(comments.router)
+app.include_router(users.router)
+app.include_router(timeline.router)
+app.include_router(realtime.router)
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    health = {"status": "healthy", "db_pool": all_pool_stats()}
+    if LIKE_BUFFER_ENABLED:
+        health["like_buffer"] = like_buffer.metrics()
+    if RANKING_ENABLED:
+        health["ranking"] = ranking.metrics()
+    health["realtime"] = hub.metrics()
+    if RATE_LIMIT_ENABLED or LOAD_SHED_ENABLED:
+        health["rate_limit"] = ratelimit.metrics()
+    return health
+
+
+@app.get("/metrics")
+async def metrics():
+    gauges = {}
+    for name, stats in all_pool_stats().items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                gauges.setdefault(f"db_pool_{key}", []).append(({"engine": name}, value))
+    gauges["password_hash_pending"] = [({}, password_hasher.pending)]
+    if LIKE_BUFFER_ENABLED:
+        for key, value in like_buffer.metrics().items():
+            gauges[f"like_buffer_{key}"] = [({}, value)]
+    if RANKING_ENABLED:
+        for key, value in ranking.metrics().items():
+            gauges[f"ranking_{key}"] = [({}, value)]
+    for key, value in hub.metrics().items():
+        gauges[f"realtime_{key}"] = [({}, value)]
+    if RATE_LIMIT_ENABLED or LOAD_SHED_ENABLED:
+        for key, value in ratelimit.metrics().items():
+            gauges[f"rate_limit_{key}"] = [({}, value)]
+    return Response(registry.render(gauges), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,177 @@
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from dotenv import load_dotenv
+import logging
+import os
+import time
+
+load_dotenv()
+
+# 0 disables the corresponding log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "rows_affected", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows_affected = 0
+        self.shapes: Counter = Counter()
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+# SQLAlchemy hooks: every statement is attributed to the request that issued it
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+    stats = _current_request.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_seconds += elapsed
+    # only writes: drivers report -1 (or a count not yet known) for SELECTs before they are fetched
+    if (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+        stats.rows_affected += cursor.rowcount
+    if N_PLUS_ONE_THRESHOLD:
+        stats.shapes[statement] += 1
+
+
+def instrument_engine(db_engine) -> None:
+    sync_engine = db_engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RouteStats:
+    __slots__ = ("statuses", "buckets", "latency_sum", "count", "statements", "db_seconds", "rows_affected")
+
+    def __init__(self):
+        self.statuses: Counter = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows_affected = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def observe(self, method: str, route: str, status: int, latency: float, stats: RequestStats) -> None:
+        entry = self.routes.get((method, route))
+        if entry is None:
+            entry = self.routes[(method, route)] = RouteStats()
+        entry.statuses[status] += 1
+        entry.count += 1
+        entry.latency_sum += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                entry.buckets[i] += 1
+        entry.statements += stats.statements
+        entry.db_seconds += stats.db_seconds
+        entry.rows_affected += stats.rows_affected
+
+    def render(self, gauges: Dict[str, List[Tuple[dict, float]]]) -> str:
+        lines = []
+
+        def emit(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+        routes = sorted(self.routes.items())
+        emit("http_requests_total", "counter", "HTTP requests by route and status.", [
+            ({"method": m, "route": r, "status": s}, n)
+            for (m, r), e in routes for s, n in sorted(e.statuses.items())
+        ])
+        # one histogram family: its _bucket, _sum and _count samples share the header
+        emit("http_request_duration_seconds", "histogram", "Request latency.", [])
+        for (m, r), e in routes:
+            labels = {"method": m, "route": r}
+            for bound, n in zip(LATENCY_BUCKETS, e.buckets):
+                lines.append(f"http_request_duration_seconds_bucket{_labels({**labels, 'le': bound})} {n}")
+            lines.append(f"http_request_duration_seconds_bucket{_labels({**labels, 'le': '+Inf'})} {e.count}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(labels)} {round(e.latency_sum, 6)}")
+            lines.append(f"http_request_duration_seconds_count{_labels(labels)} {e.count}")
+        emit("db_statements_total", "counter", "SQL statements issued per route.", [
+            ({"method": m, "route": r}, e.statements) for (m, r), e in routes
+        ])
+        emit("db_time_seconds_total", "counter", "Time spent in SQL per route.", [
+            ({"method": m, "route": r}, round(e.db_seconds, 6)) for (m, r), e in routes
+        ])
+        emit("db_rows_affected_total", "counter", "Rows inserted, updated or deleted per route.", [
+            ({"method": m, "route": r}, e.rows_affected) for (m, r), e in routes
+        ])
+        for name, samples in gauges.items():
+            emit(name, "gauge", name.replace("_", " ") + ".", samples)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Records latency and SQL usage per route and adds a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} queries", app;dur={total_ms:.2f}',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            registry.observe(scope["method"], path, status, time.perf_counter() - started, stats)
+            if N_PLUS_ONE_THRESHOLD:
+                for statement, count in stats.shapes.items():
+                    if count > N_PLUS_ONE_THRESHOLD:
+                        logger.warning("Possible N+1 on %s %s: statement ran %d times: %s", scope["method"], path, count, statement)
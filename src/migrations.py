@@ -0,0 +1,202 @@
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, insert, select, text
+from sqlalchemy.schema import CreateColumn, CreateTable
+from dotenv import load_dotenv
+import os
+
+from .counters import backfill_user_stats, reconcile_counts
+from .database import Base, engine
+from .search import create_search_index, drop_search_index
+from . import models  # noqa: F401  (registers every table on Base.metadata)
+
+load_dotenv()
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", "60"))
+LOCK_NAME = "schema_migrations"
+
+# kept off Base.metadata so model-driven create/drop never touches it
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable
+
+
+# Schema helpers: everything is derived from the models, and each helper only
+# touches what is missing, so a migration is safe on both fresh and old databases.
+def create_tables(conn, *names: str) -> None:
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables[name] for name in names], checkfirst=True)
+
+
+def add_columns(conn, table_name: str, *column_names: str) -> None:
+    table = Base.metadata.tables[table_name]
+    existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    preparer = conn.dialect.identifier_preparer
+    for name in column_names:
+        if name not in existing:
+            ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+
+
+def create_indexes(conn, table_name: str, *index_names: str) -> None:
+    table = Base.metadata.tables[table_name]
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table_name)}
+    for index in table.indexes:
+        if index.name in index_names and index.name not in existing:
+            index.create(conn)
+
+
+# SQLite reuses the highest rowid once it is deleted, unless the table is AUTOINCREMENT,
+# which ALTER TABLE cannot add: rebuild the table, then start its sequence past every
+# id already in the archive table.
+def sqlite_autoincrement(conn, table_name: str, archive_name: str) -> None:
+    if conn.dialect.name != "sqlite":
+        return
+    table = Base.metadata.tables[table_name]
+    ddl = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table_name}
+    ).scalar()
+    if "AUTOINCREMENT" not in ddl.upper():
+        scratch = MetaData()
+        for key in table.foreign_keys:
+            key.column.table.to_metadata(scratch)
+        staging = table.to_metadata(scratch, name=f"{table_name}__rebuild")
+        conn.execute(CreateTable(staging))
+        columns = ", ".join(column.name for column in table.columns)
+        conn.execute(text(f"INSERT INTO {staging.name} ({columns}) SELECT {columns} FROM {table_name}"))
+        conn.execute(text(f"DROP TABLE {table_name}"))
+        conn.execute(text(f"ALTER TABLE {staging.name} RENAME TO {table_name}"))
+        create_indexes(conn, table_name, *[index.name for index in table.indexes])
+    archive = Base.metadata.tables[archive_name]
+    floor = max(
+        conn.execute(select(func.max(table.c.id))).scalar() or 0,
+        conn.execute(select(func.max(archive.c.id))).scalar() or 0,
+    )
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table_name})
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table_name, "seq": floor})
+
+
+def _archive_safe_ids(conn) -> None:
+    for table_name in ("posts", "comments", "likes"):
+        sqlite_autoincrement(conn, table_name, f"{table_name}_archive")
+    # dropping posts took its full-text triggers with it
+    create_search_index(conn)
+
+
+def _post_counters(conn) -> None:
+    add_columns(conn, "posts", "like_count", "comment_count")
+    conn.execute(reconcile_counts())
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base tables", lambda conn: create_tables(conn, "users", "posts", "comments", "likes")),
+    Migration(2, "denormalized post counters", _post_counters),
+    Migration(3, "keyset pagination indexes", lambda conn: (
+        create_indexes(conn, "posts", "ix_posts_created_at_id"),
+        create_indexes(conn, "comments", "ix_comments_post_id_created_at_id"),
+    )),
+    Migration(4, "author and liker indexes", lambda conn: (
+        create_indexes(conn, "posts", "ix_posts_author_id_created_at"),
+        create_indexes(conn, "likes", "ix_likes_user_id"),
+    )),
+    Migration(5, "post full-text search index", create_search_index),
+    Migration(6, "follows and home timelines", lambda conn: (
+        add_columns(conn, "users", "follower_count"),
+        create_tables(conn, "follows", "timeline_entries"),
+    )),
+    Migration(7, "per-user activity stats", lambda conn: (
+        create_tables(conn, "user_stats"),
+        backfill_user_stats(conn),
+    )),
+    Migration(8, "archive tables", lambda conn: create_tables(conn, "posts_archive", "comments_archive", "likes_archive")),
+    Migration(9, "never reuse archived ids", _archive_safe_ids),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# Only one process migrates at a time; the others wait on the lock and then find nothing to do
+def _acquire_lock(conn) -> None:
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}).scalar()
+        if acquired != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+    elif dialect == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), {"name": LOCK_NAME})
+    elif dialect == "sqlite":
+        # take the database write lock up front, before schema_migrations is read;
+        # it is held until the migration transaction commits
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT * 1000}")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _release_lock(conn) -> None:
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+    elif dialect == "postgresql":
+        conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": LOCK_NAME})
+
+
+def _applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars().all())
+
+
+def _migrate(conn) -> List[int]:
+    _acquire_lock(conn)
+    try:
+        applied = _applied_versions(conn)
+        ran = []
+        for migration in MIGRATIONS:
+            if migration.version in applied:
+                continue
+            migration.upgrade(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.version, name=migration.name, applied_at=datetime.utcnow(),
+            ))
+            ran.append(migration.version)
+        return ran
+    finally:
+        _release_lock(conn)
+
+
+def _pending(conn) -> List[Migration]:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return list(MIGRATIONS)
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars().all())
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+async def migrate(db_engine=engine) -> List[int]:
+    async with db_engine.begin() as conn:
+        return await conn.run_sync(_migrate)
+
+
+# Drop everything the migrations created, then migrate from scratch (benchmarks and tests)
+def _drop_schema(conn) -> None:
+    drop_search_index(conn)
+    Base.metadata.drop_all(conn)
+    schema_migrations.drop(conn, checkfirst=True)
+
+
+async def reset_schema(db_engine=engine) -> List[int]:
+    async with db_engine.begin() as conn:
+        await conn.run_sync(_drop_schema)
+    return await migrate(db_engine)
+
+
+async def pending_migrations(db_engine=engine) -> List[Migration]:
+    async with db_engine.connect() as conn:
+        return await conn.run_sync(_pending)
@@ -21,6 +21,7 @@ class User(Base):
     id = Column(INTEGER, primary_key=True, autoincrement=True)
     username = Column(String(150), unique=True, nullable=False, index=True)
     password = Column(String(255), nullable=False)
+    follower_count = Column(INTEGER, nullable=False, default=0, server_default="0")
 
     posts = relationship("Post", back_populates="author", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="author", cascade="all, delete-orphan")
@@ -34,11 +35,20 @@ class Post(Base):
     content = Column(Text, nullable=False)
     author_id = Column(INTEGER, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    like_count = Column(INTEGER, nullable=False, default=0, server_default="0")
+    comment_count = Column(INTEGER, nullable=False, default=0, server_default="0")
 
     author = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_author_id_created_at", "author_id", "created_at"),
+        # never hand out an id that may already be in the archive tables
+        {"sqlite_autoincrement": True},
+    )
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -51,6 +61,11 @@ class Comment(Base):
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
 
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
 
 class Like(Base):
     __tablename__ = "likes"
@@ -62,4 +77,71 @@ class Like(Base):
     post = relationship("Post", back_populates="likes")
     user = relationship("User", back_populates="likes")
 
-    __table_args__ = (UniqueConstraint("post_id", "user_id", name="uix_post_user"),)
+    __table_args__ = (
+        UniqueConstraint("post_id", "user_id", name="uix_post_user"),
+        Index("ix_likes_user_id", "user_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class Follow(Base):
+    __tablename__ = "follows"
+    follower_id = Column(INTEGER, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    followee_id = Column(INTEGER, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_follows_followee_id_follower_id", "followee_id", "follower_id"),)
+
+
+# Fan-out-on-write home timelines: one row per (reader, post)
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+    user_id = Column(INTEGER, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(INTEGER, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(INTEGER, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_timeline_entries_user_id_created_at_post_id", "user_id", "created_at", "post_id"),)
+
+
+# Per-user activity totals, maintained by the write paths alongside the rows they count
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(INTEGER, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_count = Column(INTEGER, nullable=False, default=0, server_default="0")
+    comment_count = Column(INTEGER, nullable=False, default=0, server_default="0")
+    likes_given = Column(INTEGER, nullable=False, default=0, server_default="0")
+    likes_received = Column(INTEGER, nullable=False, default=0, server_default="0")
+
+
+# Cold tier: posts older than ARCHIVE_AFTER_DAYS, moved here with their comments and likes
+# by src.commands.archive. Rows keep their original ids and are read-only.
+class ArchivedPost(Base):
+    __tablename__ = "posts_archive"
+    id = Column(INTEGER, primary_key=True, autoincrement=False)
+    title = Column(String(255), nullable=False)
+    content = Column(Text, nullable=False)
+    author_id = Column(INTEGER, nullable=False, index=True)
+    created_at = Column(DateTime)
+    like_count = Column(INTEGER, nullable=False, default=0, server_default="0")
+    comment_count = Column(INTEGER, nullable=False, default=0, server_default="0")
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ArchivedComment(Base):
+    __tablename__ = "comments_archive"
+    id = Column(INTEGER, primary_key=True, autoincrement=False)
+    post_id = Column(INTEGER, nullable=False)
+    author_id = Column(INTEGER, nullable=False, index=True)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_comments_archive_post_id_created_at_id", "post_id", "created_at", "id"),)
+
+
+class ArchivedLike(Base):
+    __tablename__ = "likes_archive"
+    id = Column(INTEGER, primary_key=True, autoincrement=False)
+    post_id = Column(INTEGER, nullable=False, index=True)
+    user_id = Column(INTEGER, nullable=False, index=True)
+    created_at = Column(DateTime)
@@ -0,0 +1,55 @@
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from datetime import datetime
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+import base64
+import json
+import os
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Cursors are opaque tokens wrapping the (created_at, id) of the last row served
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(created_at_col, id_col, cursor: str, descending: bool):
+    created_at, row_id = decode_cursor(cursor)
+    if descending:
+        return or_(created_at_col < created_at, and_(created_at_col == created_at, id_col < row_id))
+    return or_(created_at_col > created_at, and_(created_at_col == created_at, id_col > row_id))
+
+
+def paginate(items: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    # callers fetch limit + 1 rows; the extra row only tells us another page exists
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(last["created_at"], last["id"])
+
+
+def parse_id_list(raw: str, max_items: int) -> List[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if len(ids) > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} ids per request")
+    return list(dict.fromkeys(ids))
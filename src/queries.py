@@ -0,0 +1,133 @@
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func
+
+from .models import Post, User, Comment
+
+
+# Post feed: posts with author username and denormalized counters in one statement
+def post_feed_query():
+    return (
+        select(
+            Post.id,
+            Post.title,
+            Post.content,
+            Post.author_id,
+            User.username.label("author_username"),
+            Post.created_at,
+            Post.like_count,
+            Post.comment_count,
+        )
+        .join(User, User.id == Post.author_id)
+    )
+
+
+def serialize_post(row) -> dict:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "content": row.content,
+        "author_id": row.author_id,
+        "author_username": row.author_username,
+        "created_at": row.created_at.isoformat(),
+        "like_count": row.like_count or 0,
+        "comment_count": row.comment_count or 0,
+    }
+
+
+async def fetch_posts(db: AsyncSession, stmt) -> List[dict]:
+    q = await db.execute(stmt)
+    return [serialize_post(row) for row in q.all()]
+
+
+# Posts in the order of `post_ids`; ids that no longer exist are skipped
+async def fetch_posts_by_ids(db: AsyncSession, post_ids: List[int]) -> List[dict]:
+    if not post_ids:
+        return []
+    by_id = {post["id"]: post for post in await fetch_posts(db, post_feed_query().where(Post.id.in_(post_ids)))}
+    return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+
+async def fetch_post(db: AsyncSession, post_id: int) -> Optional[dict]:
+    q = await db.execute(post_feed_query().where(Post.id == post_id))
+    row = q.first()
+    return serialize_post(row) if row else None
+
+
+# Comments with their author username
+def comment_query():
+    return (
+        select(
+            Comment.id,
+            Comment.post_id,
+            Comment.author_id,
+            User.username.label("author_username"),
+            Comment.content,
+            Comment.created_at,
+        )
+        .join(User, User.id == Comment.author_id)
+    )
+
+
+# One page of a post's comments; the post is the driving row so a missing post
+# yields no rows at all, while an existing post without comments yields one row
+# whose comment columns are NULL.
+def post_comments_query(post_id: int, *criteria):
+    return (
+        select(
+            Post.id.label("found_post_id"),
+            Comment.id,
+            Comment.post_id,
+            Comment.author_id,
+            User.username.label("author_username"),
+            Comment.content,
+            Comment.created_at,
+        )
+        .select_from(Post)
+        .outerjoin(Comment, and_(Comment.post_id == Post.id, *criteria))
+        .outerjoin(User, User.id == Comment.author_id)
+        .where(Post.id == post_id)
+    )
+
+
+# First `per_post` comments of each post, ranked with a window function; pass
+# ArchivedComment as `model` for posts in the archive
+def comment_previews_query(post_ids, per_post: int, model=Comment):
+    ranked = (
+        select(
+            model.id,
+            model.post_id,
+            model.author_id,
+            model.content,
+            model.created_at,
+            func.row_number()
+            .over(partition_by=model.post_id, order_by=(model.created_at.asc(), model.id.asc()))
+            .label("position"),
+        )
+        .where(model.post_id.in_(post_ids))
+        .subquery()
+    )
+    return (
+        select(
+            ranked.c.id,
+            ranked.c.post_id,
+            ranked.c.author_id,
+            User.username.label("author_username"),
+            ranked.c.content,
+            ranked.c.created_at,
+        )
+        .join(User, User.id == ranked.c.author_id)
+        .where(ranked.c.position <= per_post)
+        .order_by(ranked.c.post_id, ranked.c.position)
+    )
+
+
+def serialize_comment(row) -> dict:
+    return {
+        "id": row.id,
+        "post_id": row.post_id,
+        "author_id": row.author_id,
+        "author_username": row.author_username,
+        "content": row.content,
+        "created_at": row.created_at.isoformat(),
+    }
@@ -0,0 +1,244 @@
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, func
+from fastapi import HTTPException
+from dotenv import load_dotenv
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+
+from .database import ReadSessionLocal
+from .models import Post, Like, Comment
+from .response_cache import response_cache
+
+load_dotenv()
+
+RANKING_ENABLED = os.getenv("RANKING_ENABLED", "true").lower() in ("1", "true", "yes")
+RANKING_REFRESH_SECONDS = float(os.getenv("RANKING_REFRESH_SECONDS", "5"))
+RANKING_SIZE = int(os.getenv("RANKING_SIZE", "1000"))
+RANKING_BATCH_SIZE = int(os.getenv("RANKING_BATCH_SIZE", "5000"))
+RANKING_READY_TIMEOUT = float(os.getenv("RANKING_READY_TIMEOUT", "2"))
+RANKING_COMMENT_WEIGHT = float(os.getenv("RANKING_COMMENT_WEIGHT", "2"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+
+SORTS = ("top", "trending")
+# activity older than this many half-lives contributes under 0.5% and is not loaded
+_TRENDING_WINDOW_HALF_LIVES = 8
+# rebase the decay landmark well before exp() could overflow
+_MAX_EXPONENT = 300.0
+
+logger = logging.getLogger(__name__)
+
+
+def ranking_tag(sort: str) -> str:
+    return f"ranking:{sort}"
+
+
+def _merge_top(current: List[Tuple[float, int]], updates: Dict[int, Optional[float]], size: int) -> List[Tuple[float, int]]:
+    # only updated posts can move: every other score is unchanged, so the new
+    # top-N is drawn from the old top-N plus the updates
+    scores = {post_id: score for score, post_id in current}
+    for post_id, score in updates.items():
+        if score is None:
+            scores.pop(post_id, None)
+        else:
+            scores[post_id] = score
+    return heapq.nlargest(size, ((score, post_id) for post_id, score in scores.items()))
+
+
+class Ranking:
+    """In-memory top and trending rankings, refreshed incrementally in the background.
+
+    top is all-time engagement (likes + comment_weight * comments), read from the
+    denormalized counters of the posts that saw new activity. trending decays each
+    like or comment with the given half-life. It uses forward decay: an event at time t
+    weighs exp((t - landmark) / tau), so stored scores never change as time passes and
+    the order of untouched posts stays put. Each refresh only reads Like and Comment
+    rows past the id watermarks of the previous one.
+    """
+
+    def __init__(self, size: int, refresh_interval: float, batch_size: int, comment_weight: float, half_life_hours: float):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.comment_weight = comment_weight
+        self.tau = half_life_hours * 3600 / math.log(2)
+        self.window = timedelta(hours=half_life_hours * _TRENDING_WINDOW_HALF_LIVES)
+        self._lists: Dict[str, List[Tuple[float, int]]] = {sort: [] for sort in SORTS}
+        self._trending: Dict[int, float] = {}
+        self._landmark = 0.0
+        self._like_watermark = 0
+        self._comment_watermark = 0
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refresh_count = 0
+        self.refresh_errors = 0
+        self.last_refresh_seconds = 0.0
+
+    def _event_weight(self, created_at: Optional[datetime], weight: float) -> float:
+        # created_at columns hold naive UTC
+        timestamp = created_at.replace(tzinfo=timezone.utc).timestamp() if created_at else time.time()
+        return weight * math.exp((timestamp - self._landmark) / self.tau)
+
+    def _rebase(self, now: float) -> None:
+        # moving the landmark scales every score by the same factor; order is preserved
+        if (now - self._landmark) / self.tau < _MAX_EXPONENT:
+            return
+        factor = math.exp((self._landmark - now) / self.tau)
+        self._landmark = now
+        self._trending = {post_id: score * factor for post_id, score in self._trending.items()}
+        self._lists["trending"] = [(score * factor, post_id) for score, post_id in self._lists["trending"]]
+
+    async def _scan(self, db, model, watermark: int, since: Optional[datetime] = None, until: Optional[int] = None) -> AsyncIterator[list]:
+        # batches of (id, post_id, created_at) past the watermark, in id order
+        while True:
+            stmt = select(model.id, model.post_id, model.created_at).where(model.id > watermark)
+            if since is not None:
+                stmt = stmt.where(model.created_at >= since)
+            if until is not None:
+                stmt = stmt.where(model.id <= until)
+            q = await db.execute(stmt.order_by(model.id).limit(self.batch_size))
+            rows = q.all()
+            if rows:
+                yield rows
+            if len(rows) < self.batch_size:
+                return
+            watermark = rows[-1].id
+
+    def _add_events(self, rows, weight: float, touched: Dict[int, Optional[float]]) -> None:
+        for row in rows:
+            score = self._trending.get(row.post_id, 0.0) + self._event_weight(row.created_at, weight)
+            self._trending[row.post_id] = touched[row.post_id] = score
+
+    async def _bootstrap(self, db) -> None:
+        self._trending = {}
+        self._landmark = time.time() - self.window.total_seconds()
+        top_score = (Post.like_count + self.comment_weight * Post.comment_count).label("score")
+        q = await db.execute(select(Post.id, top_score).order_by(top_score.desc()).limit(self.size))
+        self._lists["top"] = [(float(row.score), row.id) for row in q.all() if row.score]
+        # watermarks first, so events committed during the load are picked up by the next refresh
+        q = await db.execute(select(
+            select(func.max(Like.id)).scalar_subquery(),
+            select(func.max(Comment.id)).scalar_subquery(),
+        ))
+        like_max, comment_max = q.one()
+        self._like_watermark, self._comment_watermark = like_max or 0, comment_max or 0
+        since = datetime.utcnow() - self.window
+        for model, weight, until in ((Like, 1.0, self._like_watermark), (Comment, self.comment_weight, self._comment_watermark)):
+            async for rows in self._scan(db, model, 0, since=since, until=until):
+                self._add_events(rows, weight, {})
+        self._lists["trending"] = heapq.nlargest(self.size, ((score, post_id) for post_id, score in self._trending.items()))
+
+    async def refresh(self) -> None:
+        async with ReadSessionLocal() as db:
+            if not self._ready.is_set():
+                await self._bootstrap(db)
+                self._ready.set()
+                response_cache.invalidate(*[ranking_tag(sort) for sort in SORTS])
+                return
+            self._rebase(time.time())
+            # rows are visible at commit but numbered at insert, so a row that commits
+            # behind the watermark is missed; top is unaffected since it reads counters
+            touched: Dict[int, Optional[float]] = {}
+            async for rows in self._scan(db, Like, self._like_watermark):
+                self._add_events(rows, 1.0, touched)
+                self._like_watermark = rows[-1].id
+            async for rows in self._scan(db, Comment, self._comment_watermark):
+                self._add_events(rows, self.comment_weight, touched)
+                self._comment_watermark = rows[-1].id
+            if not touched:
+                return
+
+            top_updates: Dict[int, Optional[float]] = dict.fromkeys(touched)
+            ids = list(touched)
+            for start in range(0, len(ids), self.batch_size):
+                q = await db.execute(
+                    select(Post.id, Post.like_count, Post.comment_count).where(Post.id.in_(ids[start:start + self.batch_size]))
+                )
+                for row in q.all():
+                    top_updates[row.id] = row.like_count + self.comment_weight * row.comment_count
+            # posts that disappeared since their activity drop out of both rankings
+            for post_id, score in top_updates.items():
+                if score is None:
+                    touched[post_id] = None
+                    self._trending.pop(post_id, None)
+        self._lists["top"] = _merge_top(self._lists["top"], top_updates, self.size)
+        self._lists["trending"] = _merge_top(self._lists["trending"], touched, self.size)
+        self._prune()
+        response_cache.invalidate(*[ranking_tag(sort) for sort in SORTS])
+
+    def _prune(self) -> None:
+        # forget posts whose trending score has decayed below one event from the window's start
+        floor = self._event_weight(datetime.utcnow() - self.window, 1.0)
+        if len(self._trending) > self.size:
+            self._trending = {post_id: score for post_id, score in self._trending.items() if score >= floor}
+
+    def discard(self, post_ids: Iterable[int]) -> None:
+        # posts that left the live table without new activity (archived or deleted)
+        gone = set(post_ids)
+        for sort in SORTS:
+            self._lists[sort] = [(score, post_id) for score, post_id in self._lists[sort] if post_id not in gone]
+        for post_id in gone:
+            self._trending.pop(post_id, None)
+
+    async def top_ids(self, sort: str, limit: int) -> List[int]:
+        if self._ready is not None and not self._ready.is_set():
+            # the first load may still be running, or failing (e.g. the replica is down)
+            try:
+                await asyncio.wait_for(self._ready.wait(), RANKING_READY_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Rankings are not loaded yet",
+                    headers={"Retry-After": str(max(1, math.ceil(self.refresh_interval)))},
+                )
+        return [post_id for _, post_id in self._lists[sort][:limit]]
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            try:
+                await self.refresh()
+                self.refresh_count += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.refresh_errors += 1
+                logger.exception("Refreshing post rankings failed")
+            self.last_refresh_seconds = time.perf_counter() - started
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._ready = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "ready": int(self._ready is not None and self._ready.is_set()),
+            "tracked_posts": len(self._trending),
+            "refresh_count": self.refresh_count,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_seconds": round(self.last_refresh_seconds, 6),
+        }
+
+
+ranking = Ranking(
+    size=RANKING_SIZE,
+    refresh_interval=RANKING_REFRESH_SECONDS,
+    batch_size=RANKING_BATCH_SIZE,
+    comment_weight=RANKING_COMMENT_WEIGHT,
+    half_life_hours=TRENDING_HALF_LIFE_HOURS,
+)
@@ -0,0 +1,259 @@
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Callable, Hashable, Iterable, Optional, Tuple
+from fastapi import HTTPException
+from starlette.routing import Match
+from dotenv import load_dotenv
+import json
+import math
+import os
+import time
+
+from .controllers import decode_access_token
+from .database import all_pool_stats
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+RATE_LIMIT_USER_RATE = float(os.getenv("RATE_LIMIT_USER_RATE", "5"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "20"))
+RATE_LIMIT_ROUTE_RATE = float(os.getenv("RATE_LIMIT_ROUTE_RATE", "200"))
+RATE_LIMIT_ROUTE_BURST = float(os.getenv("RATE_LIMIT_ROUTE_BURST", "400"))
+RATE_LIMIT_EXPORT_RATE = float(os.getenv("RATE_LIMIT_EXPORT_RATE", "0.1"))
+RATE_LIMIT_EXPORT_BURST = float(os.getenv("RATE_LIMIT_EXPORT_BURST", "2"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# addresses of our own reverse proxies / load balancers, whose X-Forwarded-For is believed
+RATE_LIMIT_TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if ip.strip()}
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "false").lower() in ("1", "true", "yes")
+LOAD_SHED_MIN_CONCURRENCY = int(os.getenv("LOAD_SHED_MIN_CONCURRENCY", "8"))
+LOAD_SHED_MAX_CONCURRENCY = int(os.getenv("LOAD_SHED_MAX_CONCURRENCY", "200"))
+LOAD_SHED_TARGET_WAIT_MS = float(os.getenv("LOAD_SHED_TARGET_WAIT_MS", "20"))
+LOAD_SHED_WRITE_SHARE = float(os.getenv("LOAD_SHED_WRITE_SHARE", "0.5"))
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# POSTs that only read (the body carries what would not fit in a query string)
+READ_ONLY_POSTS = {"/api/posts/batch"}
+# reads that stream whole tables; they draw from a separate, much smaller per-user bucket
+EXPORT_PATHS = {"/api/posts/export", "/api/posts/comments/export"}
+# long-lived streams would pin an in-flight slot for their whole lifetime
+EXEMPT_PATHS = {"/health", "/metrics", "/api/events"}
+
+
+class RateLimitBackend(ABC):
+    """Token bucket store. A shared backend (e.g. Redis with a Lua script) lets several
+    workers draw from the same buckets; it implements the same coroutine.
+    """
+
+    @abstractmethod
+    async def take(self, key: Hashable, rate: float, burst: float) -> float:
+        """Take one token; returns 0 when allowed, else the seconds until one is available."""
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets; the least recently used ones are dropped past max_keys."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key, rate, burst):
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdaptiveConcurrencyLimiter:
+    """Caps in-flight requests per worker, adjusting the cap from DB pool wait time.
+
+    Every adjust_interval the average connection checkout wait since the last check
+    is compared with target_wait: above it the cap shrinks by a quarter, below it
+    (while the cap is actually being used) it grows by one. Writes may only use
+    write_share of the cap, so readers keep headroom when writers pile up. Without
+    pool statistics (SQLite) the cap stays at max_limit.
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        target_wait: float,
+        write_share: float,
+        pool_stats: Callable[[], dict] = all_pool_stats,
+        adjust_interval: float = 0.5,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_wait = target_wait
+        self.write_share = write_share
+        self.pool_stats = pool_stats
+        self.adjust_interval = adjust_interval
+        self.limit = max_limit
+        self.inflight = 0
+        self.peak_inflight = 0
+        self._adjusted_at = time.monotonic()
+        self._waits = self._wait_totals()
+
+    def _wait_totals(self) -> Tuple[int, float]:
+        count, seconds = 0, 0.0
+        for stats in self.pool_stats().values():
+            count += stats.get("checkout_count", 0)
+            seconds += stats.get("wait_seconds_total", 0.0)
+        return count, seconds
+
+    def _adjust(self, now: float) -> None:
+        if now - self._adjusted_at < self.adjust_interval:
+            return
+        count, seconds = self._wait_totals()
+        checkouts, waited = count - self._waits[0], seconds - self._waits[1]
+        if checkouts and waited / checkouts > self.target_wait:
+            self.limit = max(self.min_limit, int(self.limit * 0.75))
+        elif self.peak_inflight >= self.limit * 0.8:
+            self.limit = min(self.max_limit, self.limit + 1)
+        self._adjusted_at, self._waits, self.peak_inflight = now, (count, seconds), self.inflight
+
+    def acquire(self, write: bool) -> bool:
+        self._adjust(time.monotonic())
+        cap = max(1, int(self.limit * self.write_share)) if write else self.limit
+        if self.inflight >= cap:
+            return False
+        self.inflight += 1
+        self.peak_inflight = max(self.peak_inflight, self.inflight)
+        return True
+
+    def release(self) -> None:
+        self.inflight -= 1
+
+
+class RateLimitMiddleware:
+    """Sheds load and applies per-user and per-route token buckets to write requests,
+    and a per-user export bucket to the export endpoints.
+
+    Runs before routing, so the route template is resolved here from `routes`.
+    Shed requests get 503 and rate-limited ones 429, both with Retry-After.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: Iterable,
+        backend: Optional[RateLimitBackend] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    ):
+        self.app = app
+        self.routes = routes
+        self.backend = backend if backend is not None else rate_limit_backend
+        self.limiter = limiter if limiter is not None else concurrency_limiter
+
+    def _route_path(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    @staticmethod
+    def _client_key(scope) -> Tuple[str, object]:
+        # authenticated writes are limited by user id, anonymous ones by client address
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        return "user", decode_access_token(token)["sub"]
+                    except HTTPException:
+                        break
+        return "ip", _client_address(scope)
+
+    async def _rate_limit_wait(self, scope) -> float:
+        if scope["path"] in EXPORT_PATHS:
+            key = ("export",) + self._client_key(scope)
+            return await self.backend.take(key, RATE_LIMIT_EXPORT_RATE, RATE_LIMIT_EXPORT_BURST)
+        # the client's own bucket first, so a client that is over its limit cannot drain the route's
+        wait = await self.backend.take(self._client_key(scope), RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST)
+        if wait:
+            return wait
+        route = (scope["method"], self._route_path(scope))
+        return await self.backend.take(("route", route), RATE_LIMIT_ROUTE_RATE, RATE_LIMIT_ROUTE_BURST)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        write = scope["method"] in WRITE_METHODS and scope["path"] not in READ_ONLY_POSTS
+        if RATE_LIMIT_ENABLED and (write or scope["path"] in EXPORT_PATHS):
+            wait = await self._rate_limit_wait(scope)
+            if wait:
+                rejections["limited_total"] += 1
+                await _reject(send, 429, "Too many requests", wait)
+                return
+        if not LOAD_SHED_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        if not self.limiter.acquire(write):
+            rejections["shed_total"] += 1
+            await _reject(send, 503, "Server is overloaded", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+# The peer address, or behind trusted proxies the last X-Forwarded-For hop they did not add
+def _client_address(scope) -> str:
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if address not in RATE_LIMIT_TRUSTED_PROXIES:
+        return address
+    forwarded = [
+        hop.strip()
+        for name, value in scope["headers"] if name == b"x-forwarded-for"
+        for hop in value.decode("latin-1").split(",")
+    ]
+    for hop in reversed(forwarded):
+        if hop and hop not in RATE_LIMIT_TRUSTED_PROXIES:
+            return hop
+    return address
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+rate_limit_backend: RateLimitBackend = InMemoryRateLimitBackend(RATE_LIMIT_MAX_KEYS)
+concurrency_limiter = AdaptiveConcurrencyLimiter(
+    LOAD_SHED_MIN_CONCURRENCY,
+    LOAD_SHED_MAX_CONCURRENCY,
+    LOAD_SHED_TARGET_WAIT_MS / 1000,
+    LOAD_SHED_WRITE_SHARE,
+)
+rejections: Counter = Counter()
+
+
+def metrics() -> dict:
+    return {
+        "limited_total": rejections["limited_total"],
+        "shed_total": rejections["shed_total"],
+        "inflight": concurrency_limiter.inflight,
+        "concurrency_limit": concurrency_limiter.limit,
+    }
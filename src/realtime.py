@@ -0,0 +1,247 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set
+from sqlalchemy import select
+from dotenv import load_dotenv
+import asyncio
+import itertools
+import logging
+import os
+
+from .database import SessionLocal
+from .models import Post
+
+load_dotenv()
+
+REALTIME_COALESCE_MS = int(os.getenv("REALTIME_COALESCE_MS", "250"))
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "256"))
+REALTIME_MAX_SUBSCRIPTIONS = int(os.getenv("REALTIME_MAX_SUBSCRIPTIONS", "200"))
+REALTIME_KEEPALIVE_SECONDS = float(os.getenv("REALTIME_KEEPALIVE_SECONDS", "15"))
+
+FEED_TOPIC = "feed"
+
+logger = logging.getLogger(__name__)
+
+# deliver(topic, event) hands an event to this worker's subscribers
+Deliver = Callable[[str, dict], None]
+
+
+def post_topic(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+class Broker(ABC):
+    """Carries events between workers.
+
+    publish() must not block the caller; every event published by any worker,
+    this one included, is handed to the deliver callback given to start().
+    """
+
+    @abstractmethod
+    def publish(self, topic: str, event: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    """Single-worker broker: events never leave the process."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def publish(self, topic: str, event: dict) -> None:
+        if self._deliver is not None:
+            self._deliver(topic, event)
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class Subscription:
+    """One connection's bounded event queue.
+
+    Events sharing a coalesce key replace each other in place, so a slow reader
+    only ever sees the latest counters of a post. A reader that still falls
+    max_pending events behind is marked overflowed and should be disconnected.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.topics: Set[str] = set()
+        self.overflowed = False
+        self.closed = False
+        self._pending: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def push(self, event: dict, coalesce_key: Optional[Hashable] = None) -> None:
+        if self.overflowed or self.closed:
+            return
+        key = coalesce_key if coalesce_key is not None else next(self._seq)
+        if key in self._pending:
+            self._pending[key] = event
+        elif len(self._pending) >= self.max_pending:
+            self.overflowed = True
+        else:
+            self._pending[key] = event
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        # None once closed or overflowed; asyncio.TimeoutError when idle for `timeout`
+        while not self._pending and not self.overflowed and not self.closed:
+            self._wakeup.clear()
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        if self.overflowed or self.closed:
+            return None
+        _, event = self._pending.popitem(last=False)
+        return event
+
+
+class RealtimeHub:
+    """In-process pub/sub for live post updates.
+
+    New posts and comments are published as they happen. Counter changes are only
+    recorded; every coalesce_interval the hub reads the current counters of all
+    touched posts in one query and publishes them, so a burst of likes on a post
+    costs one event per interval.
+    """
+
+    def __init__(self, broker: Broker, coalesce_interval: float, max_pending: int):
+        self.broker = broker
+        self.coalesce_interval = coalesce_interval
+        self.max_pending = max_pending
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._dirty: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.connections = 0
+        self.published_total = 0
+        self.delivered_total = 0
+        self.overflowed_total = 0
+
+    # Subscribers
+    def subscribe(self, topics: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        self.connections += 1
+        self.add_topics(subscription, topics)
+        return subscription
+
+    def add_topics(self, subscription: Subscription, topics: Iterable[str]) -> None:
+        for topic in topics:
+            subscription.topics.add(topic)
+            self._topics.setdefault(topic, set()).add(subscription)
+
+    def remove_topics(self, subscription: Subscription, topics: Iterable[str]) -> None:
+        for topic in list(topics):
+            subscription.topics.discard(topic)
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.overflowed:
+            self.overflowed_total += 1
+        self.remove_topics(subscription, subscription.topics)
+        subscription.close()
+        self.connections -= 1
+
+    def _deliver(self, topic: str, event: dict) -> None:
+        coalesce_key = ("counters", event["post_id"]) if event["type"] == "counters" else None
+        for subscription in self._topics.get(topic, ()):
+            subscription.push(event, coalesce_key)
+            self.delivered_total += 1
+
+    # Publishers
+    def publish(self, topic: str, event: dict) -> None:
+        self.published_total += 1
+        self.broker.publish(topic, event)
+
+    def post_created(self, post: dict) -> None:
+        self.publish(FEED_TOPIC, {"type": "post_created", "post": post})
+
+    def comment_added(self, comment: dict) -> None:
+        self.publish(post_topic(comment["post_id"]), {"type": "comment_added", "comment": comment})
+        self.counters_changed([comment["post_id"]])
+
+    def counters_changed(self, post_ids: Iterable[int]) -> None:
+        if self._task is not None:
+            self._dirty.update(post_ids)
+
+    async def _publish_counters(self) -> None:
+        post_ids, self._dirty = list(self._dirty), set()
+        async with SessionLocal() as db:
+            for start in range(0, len(post_ids), 500):
+                q = await db.execute(
+                    select(Post.id, Post.like_count, Post.comment_count).where(Post.id.in_(post_ids[start:start + 500]))
+                )
+                for row in q.all():
+                    self.publish(post_topic(row.id), {
+                        "type": "counters",
+                        "post_id": row.id,
+                        "like_count": row.like_count,
+                        "comment_count": row.comment_count,
+                    })
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.coalesce_interval)
+            if not self._dirty:
+                continue
+            try:
+                await self._publish_counters()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Publishing counter updates failed")
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.broker.start(self._deliver)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.broker.stop()
+        for subscribers in list(self._topics.values()):
+            for subscription in list(subscribers):
+                subscription.close()
+
+    def metrics(self) -> dict:
+        return {
+            "connections": self.connections,
+            "topics": len(self._topics),
+            "published_total": self.published_total,
+            "delivered_total": self.delivered_total,
+            "overflowed_total": self.overflowed_total,
+        }
+
+
+hub = RealtimeHub(InProcessBroker(), coalesce_interval=REALTIME_COALESCE_MS / 1000, max_pending=REALTIME_QUEUE_SIZE)
+
+
+def topics_for(post_ids: List[int], feed: bool) -> List[str]:
+    topics = [post_topic(post_id) for post_id in post_ids]
+    if feed:
+        topics.append(FEED_TOPIC)
+    return topics
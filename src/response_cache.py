@@ -0,0 +1,157 @@
+from fastapi import Request, Response
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+import asyncio
+import hashlib
+import itertools
+import os
+import time
+import uuid
+
+from .cache import CacheBackend, LRUCache
+from .database import READ_REPLICA_URL, REPLICA_LAG_SECONDS
+from .responses import encode_json
+
+load_dotenv()
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "5000"))
+
+FEED_HEAD_TAG = "feed:head"
+
+# build() returns (content, tags, extra headers)
+Builder = Callable[[], Awaitable[Tuple[object, List[str], Dict[str, str]]]]
+
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "tag_versions")
+
+    def __init__(self, body: bytes, headers: Dict[str, str], tag_versions: Dict[str, str]):
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.headers = headers
+        self.tag_versions = tag_versions
+
+
+class ResponseCache:
+    """Serialized JSON responses keyed per resource, invalidated through tags.
+
+    Every tag has a version token stored in the backend; an entry is only served
+    while all the tag versions it was built against are still current, so
+    invalidating a tag is a single write regardless of how many entries carry it.
+
+    Builds may read from a lagging replica, so an entry is not stored while one of
+    its tags was invalidated less than replica_lag seconds ago.
+    """
+
+    def __init__(self, backend: CacheBackend, replica_lag: float = 0.0):
+        self.backend = backend
+        self.replica_lag = replica_lag
+        self._epoch = itertools.count(1)
+        self._last_invalidation = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def _tag_version(self, tag: str) -> str:
+        version = self.backend.get(("tag", tag))
+        if version is None:
+            version = uuid.uuid4().hex
+            self.backend.set(("tag", tag), version)
+        return version
+
+    def _lookup(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self.backend.get(("response", key))
+        if entry is None:
+            return None
+        for tag, version in entry.tag_versions.items():
+            if self.backend.get(("tag", tag)) != version:
+                self.backend.delete(("response", key))
+                return None
+        return entry
+
+    def invalidate(self, *tags: str) -> None:
+        self._last_invalidation = next(self._epoch)
+        for tag in tags:
+            self.backend.delete(("tag", tag))
+            if self.replica_lag:
+                self.backend.set(("invalidated", tag), time.time())
+
+    def _recently_invalidated(self, tags: List[str]) -> bool:
+        if not self.replica_lag:
+            return False
+        since = time.time() - self.replica_lag
+        return any((self.backend.get(("invalidated", tag)) or 0) > since for tag in tags)
+
+    async def _build(self, key: Hashable, build: Builder) -> CachedResponse:
+        started_at = self._last_invalidation
+        content, tags, headers = await build()
+        body = encode_json(content)
+        entry = CachedResponse(body, headers, {tag: self._tag_version(tag) for tag in tags})
+        # a write landed while we were reading, or may not have reached the replica yet;
+        # serve the result but don't keep it
+        if self._last_invalidation == started_at and not self._recently_invalidated(tags):
+            self.backend.set(("response", key), entry)
+        return entry
+
+    async def get_or_build(self, key: Hashable, build: Builder) -> CachedResponse:
+        while True:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            # another request is already building this key; share its result
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await self._build(key, build)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def respond(self, request: Request, key: Hashable, build: Builder) -> Response:
+        entry = await self.get_or_build(key, build)
+        if entry.etag in _parse_etags(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": entry.etag})
+        return Response(
+            content=entry.body,
+            media_type="application/json",
+            headers={**entry.headers, "ETag": entry.etag},
+        )
+
+
+def _parse_etags(header: Optional[str]) -> Iterable[str]:
+    if not header:
+        return ()
+    return [tag.strip().replace("W/", "", 1) for tag in header.split(",")]
+
+
+response_cache = ResponseCache(
+    LRUCache(max_size=RESPONSE_CACHE_MAX_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS),
+    replica_lag=REPLICA_LAG_SECONDS if READ_REPLICA_URL else 0.0,
+)
+
+
+def invalidate_post(post_id: int) -> None:
+    response_cache.invalidate(post_tag(post_id))
+
+
+def invalidate_feed_head() -> None:
+    response_cache.invalidate(FEED_HEAD_TAG)
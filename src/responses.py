@@ -0,0 +1,43 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from typing import Any, Optional
+from dotenv import load_dotenv
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+load_dotenv()
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+
+# Same bytes as JSONResponse. Cached bodies always go through this encoder, so their
+# ETags stay the same whether FAST_JSON is on or not; they are encoded once per fill.
+def encode_json(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# orjson is faster but not byte-identical (floats, datetimes), so it only serves uncached responses
+def encode_json_fast(content: Any) -> bytes:
+    if FAST_JSON and orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return encode_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return encode_json_fast(content)
+
+
+# Handlers already shape rows exactly like their response_model (created_at is formatted
+# in the query layer), so with FAST_JSON on they skip FastAPI's re-validation and encode
+# directly. `response` carries headers set on the injected Response parameter.
+def fast_json(content: Any, response: Optional[Response] = None, status_code: int = 200):
+    if not FAST_JSON:
+        return content
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
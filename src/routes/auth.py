@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 
-from ..controllers import get_db, verify_password, get_password_hash, create_access_token, get_user_by_username
-from ..models import User
+from ..controllers import get_db, hash_password, check_password, create_access_token, get_user_by_username
+from ..models import User, UserStats
 from ..schemas import UserCreate, Token
 from dotenv import load_dotenv
 import os
@@ -21,9 +21,11 @@ async def register(u: UserCreate, db: AsyncSession = Depends(get_db)):
     existing = await get_user_by_username(db, u.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed = get_password_hash(u.password)
+    hashed = await hash_password(u.password)
     user = User(username=u.username, password=hashed)
     db.add(user)
+    await db.flush()
+    db.add(UserStats(user_id=user.id))
     await db.commit()
     await db.refresh(user)
     return {"id": user.id, "username": user.username}
@@ -32,8 +34,14 @@ async def register(u: UserCreate, db: AsyncSession = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     user = await get_user_by_username(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.password):
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    valid, new_hash = await check_password(form_data.password, user.password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect username or password")
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id), "username": user.username}, expires_delta=access_token_expires
@@ -1,55 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Dict, List, Optional
+from datetime import datetime
+from collections import Counter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert
+from sqlalchemy.exc import SQLAlchemyError
 
-from ..controllers import get_current_user, get_db
-from ..models import Post, Comment, User
-from ..schemas import CommentCreate, CommentOut
+from ..archive import archived_comments_query, is_archived
+from ..bulk import Chunk, insert_returning_ids, item_result, run_bulk
+from ..controllers import get_current_user, get_db, get_read_db
+from ..counters import bump_comment_count, bump_comment_counts, bump_user_stats
+from ..export import export_response
+from ..models import ArchivedComment, Post, Comment, User
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_filter, paginate, parse_id_list
+from ..queries import comment_query, comment_previews_query, post_comments_query, serialize_comment
+from ..realtime import hub
+from ..response_cache import invalidate_post
+from ..responses import fast_json
+from ..schemas import CommentCreate, CommentOut, CommentBulkCreate, BulkResult
 
 router = APIRouter(prefix="/api/posts")
 
 
 @router.post("/{post_id}/comment", response_model=CommentOut, status_code=201)
 async def add_comment(post_id: int, c: CommentCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    q = await db.execute(select(Post).where(Post.id == post_id))
-    post = q.scalars().first()
-    if not post:
+    # the counter bump doubles as the post existence check
+    bumped = await db.execute(bump_comment_count(post_id))
+    if bumped.rowcount == 0:
         raise HTTPException(status_code=404, detail="Post not found")
     comment = Comment(post_id=post_id, author_id=current_user.id, content=c.content)
     db.add(comment)
+    await db.execute(bump_user_stats(current_user.id, comment_count=1))
     await db.commit()
-    await db.refresh(comment)
-    author_q = await db.execute(select(User.username).where(User.id == comment.author_id))
-    author_username = author_q.scalar_one()
-    return {
+    invalidate_post(post_id)
+    created = {
         "id": comment.id,
         "post_id": comment.post_id,
         "author_id": comment.author_id,
-        "author_username": author_username,
+        "author_username": current_user.username,
         "content": comment.content,
         "created_at": comment.created_at.isoformat(),
     }
+    hub.comment_added(created)
+    return fast_json(created, status_code=201)
+
+
+# Comment previews for many posts at once: {post_id: [first `limit` comments]}
+@router.get("/comments", response_model=Dict[int, List[CommentOut]])
+async def get_comment_previews(
+    post_ids: str,
+    limit: int = Query(3, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
+    ids = parse_id_list(post_ids, MAX_PAGE_SIZE)
+    previews = {post_id: [] for post_id in ids}
+    if ids:
+        q = await db.execute(comment_previews_query(ids, limit))
+        for row in q.all():
+            previews[row.post_id].append(serialize_comment(row))
+        # posts without live comments may be archived ones
+        quiet = [post_id for post_id, comments in previews.items() if not comments]
+        if quiet:
+            q = await db.execute(comment_previews_query(quiet, limit, ArchivedComment))
+            for row in q.all():
+                previews[row.post_id].append(serialize_comment(row))
+    return fast_json(previews)
 
 
 @router.get("/{post_id}/comments", response_model=List[CommentOut])
-async def get_comments(post_id: int, db: AsyncSession = Depends(get_db)):
-    q = await db.execute(select(Post).where(Post.id == post_id))
-    post = q.scalars().first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    comments_q = await db.execute(select(Comment).where(Comment.post_id == post_id).order_by(Comment.created_at.asc()))
-    comments = comments_q.scalars().all()
-    results = []
-    for comment in comments:
-        author_q = await db.execute(select(User.username).where(User.id == comment.author_id))
-        author_username = author_q.scalar_one()
-        results.append({
-            "id": comment.id,
-            "post_id": comment.post_id,
-            "author_id": comment.author_id,
-            "author_username": author_username,
-            "content": comment.content,
-            "created_at": comment.created_at.isoformat(),
-        })
-    return results
+async def get_comments(
+    post_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    author_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    def filters(model):
+        criteria = []
+        if cursor:
+            criteria.append(keyset_filter(model.created_at, model.id, cursor, descending=False))
+        if author_id is not None:
+            criteria.append(model.author_id == author_id)
+        if since is not None:
+            criteria.append(model.created_at >= since)
+        return criteria
+
+    stmt = (
+        post_comments_query(post_id, *filters(Comment))
+        .order_by(Comment.created_at.asc(), Comment.id.asc())
+        .limit(limit + 1)
+    )
+    q = await db.execute(stmt)
+    rows = q.all()
+    if not rows:
+        if not await is_archived(db, post_id):
+            raise HTTPException(status_code=404, detail="Post not found")
+        q = await db.execute(
+            archived_comments_query(post_id)
+            .where(*filters(ArchivedComment))
+            .order_by(ArchivedComment.created_at.asc(), ArchivedComment.id.asc())
+            .limit(limit + 1)
+        )
+        rows = q.all()
+    results = [serialize_comment(row) for row in rows if row.id is not None]
+    results, next_cursor = paginate(results, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return fast_json(results, response)
+
+
+# Accepts a JSON array or NDJSON of {"post_id", "content"} items
+@router.post("/comments/bulk", response_model=BulkResult)
+async def add_comments_bulk(
+    request: Request,
+    return_ids: bool = True,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    touched = set()
+
+    async def insert_chunk(chunk: Chunk):
+        q = await db.execute(select(Post.id).where(Post.id.in_({c.post_id for _, c in chunk})))
+        live = set(q.scalars().all())
+        results = [item_result(index, error="Post not found") for index, c in chunk if c.post_id not in live]
+        chunk = [(index, c) for index, c in chunk if c.post_id in live]
+        if not chunk:
+            return results
+        per_post = Counter(c.post_id for _, c in chunk)
+        try:
+            rows = [{"post_id": c.post_id, "author_id": current_user.id, "content": c.content} for _, c in chunk]
+            if return_ids:
+                ids = await insert_returning_ids(db, Comment.__table__, rows)
+            else:
+                await db.execute(insert(Comment.__table__), rows)
+                ids = [None] * len(chunk)
+            await db.execute(bump_comment_counts(), [{"b_post_id": pid, "b_delta": n} for pid, n in per_post.items()])
+            await db.execute(bump_user_stats(current_user.id, comment_count=len(chunk)))
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            return results + [item_result(index, error="Database error") for index, _ in chunk]
+        touched.update(per_post)
+        return results + [item_result(index, comment_id) for (index, _), comment_id in zip(chunk, ids)]
+
+    result = await run_bulk(request, CommentBulkCreate, insert_chunk)
+    for post_id in touched:
+        invalidate_post(post_id)
+    hub.counters_changed(touched)
+    return result
+
+
+@router.get("/comments/export")
+async def export_comments(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+):
+    stmt = comment_query()
+    if since is not None:
+        stmt = stmt.where(Comment.created_at >= since)
+    stmt = stmt.order_by(Comment.id.asc())
+    return export_response(stmt, serialize_comment, list(CommentOut.__fields__), format, "comments")
@@ -1,15 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from ..controllers import get_current_user, get_db
+from ..counters import bump_like_count, bump_user_stats
+from ..like_buffer import LIKE_BUFFER_ENABLED, LikeBufferFull, like_buffer
 from ..models import Post, Like, User
+from ..realtime import hub
+from ..response_cache import invalidate_post
 
 router = APIRouter(prefix="/api/posts")
 
 
 @router.post("/{post_id}/like", status_code=201)
 async def like_post(post_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if LIKE_BUFFER_ENABLED:
+        # buffered mode: post existence and duplicates are resolved at flush time
+        try:
+            added = await like_buffer.add(post_id, current_user.id)
+        except LikeBufferFull:
+            raise HTTPException(status_code=503, detail="Likes are temporarily unavailable", headers={"Retry-After": "1"})
+        if not added:
+            raise HTTPException(status_code=400, detail="You have already liked this post")
+        return JSONResponse(status_code=202, content={"detail": "Like accepted"})
     q = await db.execute(select(Post).where(Post.id == post_id))
     post = q.scalars().first()
     if not post:
@@ -21,8 +35,13 @@ async def like_post(post_id: int, current_user: User = Depends(get_current_user)
     like = Like(post_id=post_id, user_id=current_user.id)
     db.add(like)
     try:
+        await db.execute(bump_like_count(post_id))
+        await db.execute(bump_user_stats(current_user.id, likes_given=1))
+        await db.execute(bump_user_stats(post.author_id, likes_received=1))
         await db.commit()
     except Exception:
         await db.rollback()
         raise HTTPException(status_code=400, detail="Unable to like post")
+    invalidate_post(post_id)
+    hub.counters_changed([post_id])
     return {"detail": "Post liked"}
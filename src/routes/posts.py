@@ -1,11 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from dotenv import load_dotenv
+import os
 
-from ..controllers import get_current_user, get_db
-from ..models import Post, User, Like, Comment
-from ..schemas import PostCreate, PostOut, PostUpdate, DeleteResponse
+from ..archive import fetch_archived_post
+from ..bulk import Chunk, insert_returning_ids, item_result, run_bulk
+from ..controllers import get_current_user, get_db, get_read_db
+from ..counters import bump_user_stats, bump_user_stats_many
+from ..export import export_response
+from ..loaders import PostLoader, get_post_loader
+from ..models import Comment, Like, Post, TimelineEntry, User
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_filter, paginate, parse_id_list
+from ..queries import post_feed_query, fetch_posts, fetch_posts_by_ids, fetch_post, serialize_post
+from ..realtime import hub
+from ..ranking import RANKING_ENABLED, ranking, ranking_tag
+from ..timeline import fan_out
+from ..search import SEARCH_MAX_OFFSET, post_search_query
+from ..response_cache import FEED_HEAD_TAG, response_cache, post_tag, invalidate_post, invalidate_feed_head
+from ..responses import fast_json
+from ..schemas import PostCreate, PostOut, PostUpdate, DeleteResponse, BulkResult, PostBatchRequest, PostBatchOut
+
+load_dotenv()
+
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "500"))
 
 router = APIRouter(prefix="/api/posts")
 
@@ -14,75 +35,158 @@ router = APIRouter(prefix="/api/posts")
 async def create_post(p: PostCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     post = Post(title=p.title, content=p.content, author_id=current_user.id)
     db.add(post)
+    await db.flush()
+    await db.execute(bump_user_stats(current_user.id, post_count=1))
+    await db.execute(fan_out(Post.id == post.id))
     await db.commit()
-    await db.refresh(post)
-    # counts
-    like_q = await db.execute(select(func.count()).select_from(Like).where(Like.post_id == post.id))
-    like_count = like_q.scalar() or 0
-    comment_q = await db.execute(select(func.count()).select_from(Comment).where(Comment.post_id == post.id))
-    comment_count = comment_q.scalar() or 0
-    # author username
-    author_q = await db.execute(select(User.username).where(User.id == post.author_id))
-    author_username = author_q.scalar_one()
-    return {
-        "id": post.id,
-        "title": post.title,
-        "content": post.content,
-        "author_id": post.author_id,
-        "author_username": author_username,
-        "created_at": post.created_at.isoformat(),
-        "like_count": like_count,
-        "comment_count": comment_count,
-    }
+    invalidate_feed_head()
+    created = await fetch_post(db, post.id)
+    hub.post_created(created)
+    return fast_json(created, status_code=201)
+
+
+# Accepts a JSON array or NDJSON of posts; each chunk is one multi-row INSERT, and
+# return_ids=false switches to a plain executemany that skips id retrieval
+@router.post("/bulk", response_model=BulkResult)
+async def create_posts_bulk(
+    request: Request,
+    return_ids: bool = True,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    q = await db.execute(select(func.max(Post.id)))
+    watermark = q.scalar() or 0
+
+    async def insert_chunk(chunk: Chunk):
+        try:
+            rows = [{"title": p.title, "content": p.content, "author_id": current_user.id} for _, p in chunk]
+            if return_ids:
+                ids = await insert_returning_ids(db, Post.__table__, rows)
+            else:
+                await db.execute(insert(Post.__table__), rows)
+                ids = [None] * len(chunk)
+            await db.execute(bump_user_stats(current_user.id, post_count=len(chunk)))
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            return [item_result(index, error="Database error") for index, _ in chunk]
+        return [item_result(index, post_id) for (index, _), post_id in zip(chunk, ids)]
+
+    result = await run_bulk(request, PostCreate, insert_chunk)
+    if result["created"]:
+        # one fan-out for the whole import; entries that already exist are skipped
+        await db.execute(fan_out(Post.author_id == current_user.id, Post.id > watermark))
+        await db.commit()
+        invalidate_feed_head()
+    return result
+
+
+@router.get("/export")
+async def export_posts(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+):
+    stmt = post_feed_query()
+    if since is not None:
+        stmt = stmt.where(Post.created_at >= since)
+    stmt = stmt.order_by(Post.id.asc())
+    return export_response(stmt, serialize_post, list(PostOut.__fields__), format, "posts")
+
+
+# Posts in request order plus the ids that do not exist
+async def read_batch(post_ids: List[int], loader: PostLoader):
+    posts = await loader.load_many(post_ids)
+    return fast_json({
+        "posts": [post for post in posts if post is not None],
+        "missing": [post_id for post_id, post in zip(post_ids, posts) if post is None],
+    })
+
+
+@router.get("/batch", response_model=PostBatchOut)
+async def read_posts_batch(ids: str, loader: PostLoader = Depends(get_post_loader)):
+    return await read_batch(parse_id_list(ids, BATCH_MAX_IDS), loader)
+
+
+# Same as GET /batch, for id lists too long for a query string
+@router.post("/batch", response_model=PostBatchOut)
+async def read_posts_batch_body(body: PostBatchRequest, loader: PostLoader = Depends(get_post_loader)):
+    if len(body.ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    return await read_batch(list(dict.fromkeys(body.ids)), loader)
+
+
+# Full-text search over titles and content, best match first
+@router.get("/search", response_model=List[PostOut])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return fast_json(await fetch_posts(db, post_search_query(q).limit(limit).offset(offset)))
 
 
 @router.get("", response_model=List[PostOut])
-async def read_posts(db: AsyncSession = Depends(get_db)):
-    q = await db.execute(select(Post).order_by(Post.created_at.desc()))
-    posts = q.scalars().all()
-    results = []
-    for post in posts:
-        like_q = await db.execute(select(func.count()).select_from(Like).where(Like.post_id == post.id))
-        like_count = like_q.scalar() or 0
-        comment_q = await db.execute(select(func.count()).select_from(Comment).where(Comment.post_id == post.id))
-        comment_count = comment_q.scalar() or 0
-        author_q = await db.execute(select(User.username).where(User.id == post.author_id))
-        author_username = author_q.scalar_one()
-        results.append({
-            "id": post.id,
-            "title": post.title,
-            "content": post.content,
-            "author_id": post.author_id,
-            "author_username": author_username,
-            "created_at": post.created_at.isoformat(),
-            "like_count": like_count,
-            "comment_count": comment_count,
-        })
-    return results
+async def read_posts(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    author_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    sort: Optional[str] = Query(None, regex="^(top|trending)$"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if sort:
+        return await read_ranked_posts(request, sort, limit, cursor, author_id, since, db)
+
+    async def build():
+        stmt = post_feed_query()
+        if cursor:
+            stmt = stmt.where(keyset_filter(Post.created_at, Post.id, cursor, descending=True))
+        if author_id is not None:
+            stmt = stmt.where(Post.author_id == author_id)
+        if since is not None:
+            stmt = stmt.where(Post.created_at >= since)
+        stmt = stmt.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1)
+        posts, next_cursor = paginate(await fetch_posts(db, stmt), limit)
+        # only the first page can gain new posts; deeper pages are pinned by their cursor
+        tags = [post_tag(post["id"]) for post in posts]
+        if not cursor:
+            tags.append(FEED_HEAD_TAG)
+        return posts, tags, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
+    key = ("feed", limit, cursor, author_id, since)
+    return await response_cache.respond(request, key, build)
+
+
+# Ranked feeds are a single precomputed page of at most `limit` posts
+async def read_ranked_posts(request: Request, sort: str, limit: int, cursor, author_id, since, db: AsyncSession):
+    if not RANKING_ENABLED:
+        raise HTTPException(status_code=400, detail="Ranked feeds are disabled")
+    if cursor or author_id is not None or since is not None:
+        raise HTTPException(status_code=400, detail="sort cannot be combined with cursor, author_id or since")
+
+    async def build():
+        post_ids = await ranking.top_ids(sort, limit)
+        posts = await fetch_posts_by_ids(db, post_ids)
+        if len(posts) < len(post_ids):
+            ranking.discard(set(post_ids) - {post["id"] for post in posts})
+        return posts, [post_tag(post["id"]) for post in posts] + [ranking_tag(sort)], {}
+
+    return await response_cache.respond(request, ("ranked", sort, limit), build)
 
 
 @router.get("/{post_id}", response_model=PostOut)
-async def read_post(post_id: int, db: AsyncSession = Depends(get_db)):
-    q = await db.execute(select(Post).where(Post.id == post_id))
-    post = q.scalars().first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    like_q = await db.execute(select(func.count()).select_from(Like).where(Like.post_id == post.id))
-    like_count = like_q.scalar() or 0
-    comment_q = await db.execute(select(func.count()).select_from(Comment).where(Comment.post_id == post.id))
-    comment_count = comment_q.scalar() or 0
-    author_q = await db.execute(select(User.username).where(User.id == post.author_id))
-    author_username = author_q.scalar_one()
-    return {
-        "id": post.id,
-        "title": post.title,
-        "content": post.content,
-        "author_id": post.author_id,
-        "author_username": author_username,
-        "created_at": post.created_at.isoformat(),
-        "like_count": like_count,
-        "comment_count": comment_count,
-    }
+async def read_post(post_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        # posts moved to the cold tier are still readable, just no longer writable
+        post = await fetch_post(db, post_id) or await fetch_archived_post(db, post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return post, [post_tag(post_id)], {}
+
+    return await response_cache.respond(request, ("post", post_id), build)
 
 
 @router.put("/{post_id}", response_model=PostOut)
@@ -98,23 +202,8 @@ async def update_post(post_id: int, p: PostUpdate, current_user: User = Depends(
     if p.content is not None:
         post.content = p.content
     await db.commit()
-    await db.refresh(post)
-    like_q = await db.execute(select(func.count()).select_from(Like).where(Like.post_id == post.id))
-    like_count = like_q.scalar() or 0
-    comment_q = await db.execute(select(func.count()).select_from(Comment).where(Comment.post_id == post.id))
-    comment_count = comment_q.scalar() or 0
-    author_q = await db.execute(select(User.username).where(User.id == post.author_id))
-    author_username = author_q.scalar_one()
-    return {
-        "id": post.id,
-        "title": post.title,
-        "content": post.content,
-        "author_id": post.author_id,
-        "author_username": author_username,
-        "created_at": post.created_at.isoformat(),
-        "like_count": like_count,
-        "comment_count": comment_count,
-    }
+    invalidate_post(post.id)
+    return fast_json(await fetch_post(db, post.id))
 
 
 @router.delete("/{post_id}", response_model=DeleteResponse, status_code=200)
@@ -127,8 +216,18 @@ async def delete_post(post_id: int, current_user: User = Depends(get_current_use
         raise HTTPException(status_code=403, detail="Not authorized to delete this post")
     
     deleted_post_id = post.id
+    # take back the stats the post's comments and likes contributed before they cascade away
+    await db.execute(bump_user_stats(post.author_id, post_count=-1, likes_received=-post.like_count))
+    for column, owner in (("comment_count", Comment.author_id), ("likes_given", Like.user_id)):
+        q = await db.execute(select(owner, func.count()).where(owner.class_.post_id == post_id).group_by(owner))
+        rows = [{"b_user_id": user_id, "b_delta": -total} for user_id, total in q.all()]
+        if rows:
+            await db.execute(bump_user_stats_many(column), rows)
+    # SQLite does not enforce the FK cascade; timeline pages must not count orphaned entries
+    await db.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id))
     await db.delete(post)
     await db.commit()
+    invalidate_post(deleted_post_id)
     
     return DeleteResponse(
         message="Post deleted successfully",
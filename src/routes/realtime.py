@@ -0,0 +1,95 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator
+import asyncio
+import json
+
+from ..pagination import parse_id_list
+from ..realtime import REALTIME_KEEPALIVE_SECONDS, REALTIME_MAX_SUBSCRIPTIONS, Subscription, hub, topics_for
+from ..responses import encode_json
+
+router = APIRouter(prefix="/api")
+
+
+def _apply(subscription: Subscription, message) -> None:
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+    subscribe = message.get("subscribe", [])
+    unsubscribe = message.get("unsubscribe", [])
+    # bools are ints in Python but not post ids
+    if not (isinstance(subscribe, list) and isinstance(unsubscribe, list)) or not all(
+        type(i) is int for i in subscribe + unsubscribe
+    ):
+        raise ValueError("subscribe and unsubscribe take lists of post ids")
+    feed = message.get("feed")
+    if feed is not None and not isinstance(feed, bool):
+        raise ValueError("feed takes true or false")
+    hub.remove_topics(subscription, topics_for(unsubscribe, feed is False))
+    added = topics_for(subscribe, feed is True)
+    if len(subscription.topics | set(added)) > REALTIME_MAX_SUBSCRIPTIONS:
+        raise ValueError(f"At most {REALTIME_MAX_SUBSCRIPTIONS} subscriptions per connection")
+    hub.add_topics(subscription, added)
+
+
+# Clients send {"subscribe": [post ids], "unsubscribe": [post ids], "feed": true|false}
+# and receive post_created, comment_added and counters events as JSON messages.
+@router.websocket("/ws")
+async def live_updates(websocket: WebSocket):
+    await websocket.accept()
+    subscription = hub.subscribe()
+
+    async def read_commands():
+        try:
+            while True:
+                try:
+                    _apply(subscription, json.loads(await websocket.receive_text()))
+                except ValueError as exc:
+                    await websocket.send_text(json.dumps({"type": "error", "detail": str(exc)}))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            subscription.close()
+
+    reader = asyncio.create_task(read_commands())
+    try:
+        while True:
+            event = await subscription.get()
+            if event is None:
+                break
+            await websocket.send_text(encode_json(event).decode())
+        if subscription.overflowed:
+            # the client fell too far behind; it should reconnect and refetch
+            await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        hub.unsubscribe(subscription)
+
+
+# Server-Sent Events fallback with the same events, for clients without WebSocket
+@router.get("/events")
+async def live_updates_stream(post_ids: str = "", feed: bool = False):
+    topics = topics_for(parse_id_list(post_ids, REALTIME_MAX_SUBSCRIPTIONS), feed)
+
+    async def stream() -> AsyncIterator[bytes]:
+        # subscribed inside the generator so cleanup always pairs with it
+        subscription = hub.subscribe(topics)
+        try:
+            while True:
+                try:
+                    event = await subscription.get(timeout=REALTIME_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield b"event: " + event["type"].encode() + b"\ndata: " + encode_json(event) + b"\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Query, Response
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..controllers import get_read_db, get_token_user
+from ..models import User
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, paginate
+from ..queries import fetch_posts
+from ..responses import fast_json
+from ..schemas import PostOut
+from ..timeline import timeline_query
+
+router = APIRouter(prefix="/api/timeline")
+
+
+# Posts from the accounts the current user follows, newest first
+@router.get("", response_model=List[PostOut])
+async def read_timeline(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_token_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    posts, next_cursor = paginate(await fetch_posts(db, timeline_query(current_user.id, limit + 1, cursor)), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return fast_json(posts, response)
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from ..controllers import get_current_user, get_db, get_read_db
+from ..counters import USER_STAT_COLUMNS, bump_follower_count
+from ..models import Follow, TimelineEntry, User, UserStats
+from ..schemas import UserStatsOut
+from ..timeline import FANOUT_MAX_FOLLOWERS, backfill, refill
+
+router = APIRouter(prefix="/api/users")
+
+
+@router.post("/{user_id}/follow", status_code=201)
+async def follow_user(user_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if user_id == current_user.id:
+        raise HTTPException(status_code=400, detail="You cannot follow yourself")
+    # the counter bump doubles as the user existence check
+    bumped = await db.execute(bump_follower_count(user_id))
+    if bumped.rowcount == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    db.add(Follow(follower_id=current_user.id, followee_id=user_id))
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="You already follow this user")
+    await db.execute(backfill(current_user.id, user_id))
+    await db.commit()
+    return {"detail": "User followed"}
+
+
+@router.delete("/{user_id}/follow")
+async def unfollow_user(user_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    removed = await db.execute(
+        delete(Follow).where(Follow.follower_id == current_user.id, Follow.followee_id == user_id)
+    )
+    if removed.rowcount == 0:
+        raise HTTPException(status_code=404, detail="You do not follow this user")
+    await db.execute(bump_follower_count(user_id, -1))
+    q = await db.execute(select(User.follower_count).where(User.id == user_id))
+    if q.scalar() == FANOUT_MAX_FOLLOWERS:
+        # back under the fan-out threshold: the pulled posts are no longer merged in at read time
+        await db.execute(refill(user_id))
+    await db.execute(
+        delete(TimelineEntry).where(TimelineEntry.user_id == current_user.id, TimelineEntry.author_id == user_id)
+    )
+    await db.commit()
+    return {"detail": "User unfollowed"}
+
+
+@router.get("/{user_id}/stats", response_model=UserStatsOut)
+async def read_user_stats(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    # users created before their stats row existed read as zeros
+    columns = [func.coalesce(getattr(UserStats, name), 0).label(name) for name in USER_STAT_COLUMNS]
+    q = await db.execute(
+        select(User.id.label("user_id"), User.username, *columns)
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    row = q.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return dict(row._mapping)
@@ -52,6 +52,42 @@ class CommentOut(BaseModel):
         orm_mode = True
 
 
+class CommentBulkCreate(BaseModel):
+    post_id: int
+    content: str
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int]
+    error: Optional[str]
+
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    truncated: bool = False
+    results: List[BulkItemResult]
+
+
+class PostBatchRequest(BaseModel):
+    ids: List[int]
+
+
+class PostBatchOut(BaseModel):
+    posts: List[PostOut]
+    missing: List[int]
+
+
+class UserStatsOut(BaseModel):
+    user_id: int
+    username: str
+    post_count: int
+    comment_count: int
+    likes_given: int
+    likes_received: int
+
+
 class DeleteResponse(BaseModel):
     message: str
     deleted_id: int
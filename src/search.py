@@ -0,0 +1,91 @@
+from fastapi import HTTPException
+from sqlalchemy import and_, column, func, inspect, or_, table, text
+from sqlalchemy.dialects.mysql import match
+from dotenv import load_dotenv
+import os
+import re
+
+from .database import read_engine
+from .models import Post
+from .queries import post_feed_query
+
+load_dotenv()
+
+SEARCH_MAX_TERMS = int(os.getenv("SEARCH_MAX_TERMS", "16"))
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", "1000"))
+FULLTEXT_INDEX = "ft_posts_title_content"
+
+# SQLite keeps the inverted index in an FTS5 table whose content lives in posts
+posts_fts = table("posts_fts", column("rowid"))
+
+_SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, content, content='posts', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    # only title/content edits reindex; counter bumps on posts leave the index alone
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+]
+
+
+# Migration step: build the dialect's inverted index over posts(title, content).
+# The database maintains it on every insert/update/delete, bulk and Core writes included.
+def create_search_index(conn) -> None:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for ddl in _SQLITE_FTS_DDL:
+            conn.execute(text(ddl))
+    elif dialect == "mysql":
+        existing = {ix["name"] for ix in inspect(conn).get_indexes("posts")}
+        if FULLTEXT_INDEX not in existing:
+            conn.execute(text(f"ALTER TABLE posts ADD FULLTEXT INDEX {FULLTEXT_INDEX} (title, content)"))
+
+
+# Counterpart for schema resets: the FTS table outlives a plain drop of posts
+def drop_search_index(conn) -> None:
+    if conn.dialect.name == "sqlite":
+        for trigger in ("posts_fts_ai", "posts_fts_ad", "posts_fts_au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        conn.execute(text("DROP TABLE IF EXISTS posts_fts"))
+
+
+def search_terms(q: str):
+    # words only: the terms are re-quoted below, so user input never reaches the match syntax
+    terms = re.findall(r"\w+", q)[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+    return terms
+
+
+# Posts matching every term, best match first
+def post_search_query(q: str):
+    terms = search_terms(q)
+    stmt = post_feed_query()
+    dialect = read_engine.dialect.name
+    if dialect == "sqlite":
+        expression = " ".join(f'"{term}"' for term in terms)
+        return (
+            stmt.join(posts_fts, posts_fts.c.rowid == Post.id)
+            .where(text("posts_fts MATCH :expression").bindparams(expression=expression))
+            # bm25 is lower for better matches; title hits weigh more than content hits
+            .order_by(text("bm25(posts_fts, 4.0, 1.0)"), Post.id.desc())
+        )
+    if dialect == "mysql":
+        relevance = match(Post.title, Post.content, against=" ".join(f"+{term}" for term in terms)).in_boolean_mode()
+        return stmt.where(relevance).order_by(relevance.desc(), Post.id.desc())
+    # no inverted index on other dialects: unranked substring scan, newest first
+    return (
+        stmt.where(and_(*[
+            or_(func.lower(Post.title).contains(term.lower(), autoescape=True),
+                func.lower(Post.content).contains(term.lower(), autoescape=True))
+            for term in terms
+        ]))
+        .order_by(Post.created_at.desc(), Post.id.desc())
+    )
@@ -0,0 +1,91 @@
+from sqlalchemy import select, union, literal
+from dotenv import load_dotenv
+import os
+
+from .like_buffer import insert_ignore
+from .models import Post, User, Follow, TimelineEntry
+from .pagination import keyset_filter
+from .queries import post_feed_query
+
+load_dotenv()
+
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", "800"))
+TIMELINE_BACKFILL = int(os.getenv("TIMELINE_BACKFILL", "50"))
+# authors above this many followers are merged into timelines at read time instead
+FANOUT_MAX_FOLLOWERS = int(os.getenv("FANOUT_MAX_FOLLOWERS", "10000"))
+
+
+def _entries_from(posts_select):
+    return insert_ignore(TimelineEntry.__table__).from_select(
+        ["user_id", "post_id", "author_id", "created_at"], posts_select
+    )
+
+
+# Push posts matching `criteria` into the timelines of their authors' followers,
+# in one INSERT ... SELECT. Authors over FANOUT_MAX_FOLLOWERS are skipped.
+def fan_out(*criteria):
+    return _entries_from(
+        select(Follow.follower_id, Post.id, Post.author_id, Post.created_at)
+        .join(Follow, Follow.followee_id == Post.author_id)
+        .join(User, User.id == Post.author_id)
+        .where(User.follower_count <= FANOUT_MAX_FOLLOWERS, *criteria)
+    )
+
+
+# Seed a new follower's timeline with the followee's latest posts
+def backfill(user_id: int, followee_id: int):
+    return _entries_from(
+        select(literal(user_id), Post.id, Post.author_id, Post.created_at)
+        .join(User, User.id == Post.author_id)
+        .where(Post.author_id == followee_id, User.follower_count <= FANOUT_MAX_FOLLOWERS)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(TIMELINE_BACKFILL)
+    )
+
+
+# When an author drops back to FANOUT_MAX_FOLLOWERS, their followers' timelines have
+# no entries for the posts made while they were pulled; push the latest ones again
+def refill(author_id: int):
+    latest = (
+        select(Post.id)
+        .where(Post.author_id == author_id)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(TIMELINE_BACKFILL)
+    )
+    return fan_out(Post.id.in_(select(latest.subquery().c.id)))
+
+
+# A page of a user's home timeline, newest first. Pushed entries are one range read on
+# (user_id, created_at, post_id); posts of followed authors that are not fanned out are
+# pulled in from posts(author_id, created_at). Each side is capped at `rows` before the union.
+# Entries of authors that are currently pulled, or whose post is gone, are skipped so the
+# two sides never overlap and every row counted against the limit is returned.
+def timeline_query(user_id: int, rows: int, cursor=None):
+    pushed = (
+        select(TimelineEntry.post_id.label("post_id"))
+        .join(Post, Post.id == TimelineEntry.post_id)
+        .join(User, User.id == TimelineEntry.author_id)
+        .where(TimelineEntry.user_id == user_id, User.follower_count <= FANOUT_MAX_FOLLOWERS)
+        .order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+    )
+    pulled = (
+        select(Post.id.label("post_id"))
+        .where(Post.author_id.in_(
+            select(Follow.followee_id)
+            .join(User, User.id == Follow.followee_id)
+            .where(Follow.follower_id == user_id, User.follower_count > FANOUT_MAX_FOLLOWERS)
+        ))
+        .order_by(Post.created_at.desc(), Post.id.desc())
+    )
+    if cursor:
+        pushed = pushed.where(keyset_filter(TimelineEntry.created_at, TimelineEntry.post_id, cursor, descending=True))
+        pulled = pulled.where(keyset_filter(Post.created_at, Post.id, cursor, descending=True))
+    # wrapped so each side keeps its own ORDER BY/LIMIT inside the UNION
+    branches = [select(branch.limit(rows).subquery().c.post_id) for branch in (pushed, pulled)]
+    ids = union(*branches).subquery()
+    return (
+        post_feed_query()
+        .join(ids, ids.c.post_id == Post.id)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(rows)
+    )
@@ -0,0 +1,58 @@
+"""Shared fixtures: one migrated SQLite database and one app instance per test run.
+
+    pip install -r src/requirements.txt -r tests/requirements.txt
+    python -m pytest -q tests
+
+Configuration is read at import time, so it is set here before `src` is imported.
+Tests share the database; each one creates its own users and posts.
+"""
+import itertools
+import os
+import tempfile
+
+import pytest
+
+DB_DIR = tempfile.mkdtemp(prefix="crud-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{DB_DIR}/test.db",
+    SECRET_KEY="test-secret",
+    ALGORITHM="HS256",
+    HOST="127.0.0.1",
+    PORT="8000",
+    BCRYPT_ROUNDS="4",
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.main import app  # noqa: E402
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_user(client):
+    """Registers a fresh user and returns (user_id, auth headers)."""
+
+    def make():
+        username = f"user{next(_usernames)}"
+        user_id = client.post("/api/auth/register", json={"username": username, "password": "password1"}).json()["id"]
+        token = client.post("/api/auth/login", data={"username": username, "password": "password1"}).json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def make_post(client):
+    def make(headers, title="post", content="content"):
+        response = client.post("/api/posts", json={"title": title, "content": content}, headers=headers)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    return make
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src import migrations
+from src.archive import archive_batch
+from src.database import engine
+from src.migrations import LATEST_VERSION, migrate
+from src.models import ArchivedPost, Post, User
+from src.ranking import ranking
+
+CUTOFF = datetime(2001, 1, 1)
+OLD = datetime(2000, 1, 1)
+
+
+async def _add_posts(conn, *titles):
+    result = []
+    for title in titles:
+        q = await conn.execute(insert(Post.__table__).values(title=title, content=title, author_id=1, created_at=OLD))
+        result.append(q.inserted_primary_key[0])
+    return result
+
+
+def test_archived_ids_are_not_reused(tmp_path):
+    async def scenario():
+        db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/archive.db")
+        try:
+            await migrate(db_engine)
+            async with db_engine.begin() as conn:
+                await conn.execute(insert(User.__table__), [{"id": 1, "username": "a", "password": "x"}])
+                first, second = await _add_posts(conn, "first", "second")
+            async with db_engine.begin() as conn:
+                assert await archive_batch(conn, CUTOFF) == [first, second]
+            async with db_engine.begin() as conn:
+                (third,) = await _add_posts(conn, "third")
+            assert third > second
+            # the next run only sees the new post and does not collide with the archive
+            async with db_engine.begin() as conn:
+                assert await archive_batch(conn, CUTOFF) == [third]
+                archived = await conn.execute(select(ArchivedPost.id).order_by(ArchivedPost.id))
+                assert archived.scalars().all() == [first, second, third]
+        finally:
+            await db_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_migration_makes_legacy_tables_autoincrement(tmp_path, monkeypatch):
+    async def scenario():
+        db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+        try:
+            # a database created before migration 9: plain rowid tables
+            for table in ("posts", "comments", "likes"):
+                options = Post.metadata.tables[table].dialect_options["sqlite"]
+                monkeypatch.setitem(options, "autoincrement", False)
+            monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:8])
+            await migrate(db_engine)
+            async with db_engine.begin() as conn:
+                await conn.execute(insert(User.__table__), [{"id": 1, "username": "a", "password": "x"}])
+                await _add_posts(conn, "kept", "archived")
+                await conn.execute(update(Post.__table__).where(Post.id == 1).values(created_at=datetime.utcnow()))
+                assert await archive_batch(conn, CUTOFF) == [2]
+            monkeypatch.undo()
+
+            assert await migrate(db_engine) == [LATEST_VERSION]
+            async with db_engine.begin() as conn:
+                ddl = (await conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'posts'"))).scalar()
+                (new_id,) = await _add_posts(conn, "fresh")
+                found = await conn.execute(text("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'kept OR fresh'"))
+                assert "AUTOINCREMENT" in ddl
+                assert new_id == 3
+                assert sorted(found.scalars().all()) == [1, 3]
+        finally:
+            await db_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_archived_post_is_served_from_the_archive(client, make_user, make_post):
+    _, headers = make_user()
+    post_id = make_post(headers, title="old news")
+
+    async def archive():
+        async with engine.begin() as conn:
+            await conn.execute(update(Post.__table__).where(Post.id == post_id).values(created_at=OLD))
+            return await archive_batch(conn, CUTOFF)
+
+    assert client.portal.call(archive) == [post_id]
+    response = client.get(f"/api/posts/{post_id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == "old news"
+    assert client.post(f"/api/posts/{post_id}/like", headers=headers).status_code == 404
+
+
+def test_ranking_discards_posts_that_are_gone():
+    saved = {sort: list(entries) for sort, entries in ranking._lists.items()}
+    try:
+        ranking._lists["top"] = [(3.0, 30), (2.0, 20), (1.0, 10)]
+        ranking.discard({20})
+        assert ranking._lists["top"] == [(3.0, 30), (1.0, 10)]
+    finally:
+        ranking._lists.update(saved)
+
+
+def test_batch_and_previews_include_archived_posts(client, make_user, make_post):
+    _, headers = make_user()
+    post_id = make_post(headers, title="batched")
+    live_id = make_post(headers, title="still live")
+    assert client.post(f"/api/posts/{post_id}/comment", json={"content": "first!"}, headers=headers).status_code == 201
+
+    async def archive():
+        async with engine.begin() as conn:
+            await conn.execute(update(Post.__table__).where(Post.id == post_id).values(created_at=OLD))
+            return await archive_batch(conn, CUTOFF)
+
+    assert client.portal.call(archive) == [post_id]
+    batch = client.get("/api/posts/batch", params={"ids": f"{post_id},{live_id},{10**9}"}).json()
+    assert [post["id"] for post in batch["posts"]] == [post_id, live_id]
+    assert batch["missing"] == [10**9]
+    previews = client.get("/api/posts/comments", params={"post_ids": f"{post_id},{live_id}"}).json()
+    assert [comment["content"] for comment in previews[str(post_id)]] == ["first!"]
+    assert previews[str(live_id)] == []
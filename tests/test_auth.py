@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import pytest
+
+from src import controllers
+from src.controllers import create_access_token, decode_access_token, token_cache
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    calls = []
+    decode = controllers.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(controllers.jwt, "decode", counting_decode)
+    token_cache.clear()
+    yield calls
+    token_cache.clear()
+
+
+def test_verified_tokens_are_cached(verifications):
+    token = create_access_token({"sub": "42"})
+    assert decode_access_token(token)["sub"] == 42
+    assert decode_access_token(token)["sub"] == 42
+    assert len(verifications) == 1
+
+
+def test_cached_tokens_expire_with_the_token(verifications, monkeypatch):
+    short = create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=30))
+    long = create_access_token({"sub": "2"}, expires_delta=timedelta(minutes=10))
+    decode_access_token(short)
+    decode_access_token(long)
+    clock = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: clock() + 60)
+    # a minute on the cache clock: only the short-lived token's entry has expired
+    decode_access_token(long)
+    assert len(verifications) == 2
+    decode_access_token(short)
+    assert len(verifications) == 3
+
+
+def test_asymmetric_algorithm_without_keys_fails_at_import():
+    env = {key: value for key, value in os.environ.items() if not key.startswith("JWT_")}
+    env["ALGORITHM"] = "RS256"
+    result = subprocess.run(
+        [sys.executable, "-c", "import src.controllers"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "JWT_PUBLIC_KEY or JWT_PRIVATE_KEY is required" in result.stderr
@@ -0,0 +1,68 @@
+import json
+import re
+
+import pytest
+
+from src import bulk
+
+
+@pytest.fixture
+def small_bulk(monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_MAX_ITEMS", 2)
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 1)
+
+
+def post_count(client, user_id):
+    return client.get(f"/api/users/{user_id}/stats").json()["post_count"]
+
+
+def test_oversized_array_is_rejected_before_inserting(client, make_user, small_bulk):
+    user_id, headers = make_user()
+    items = [{"title": f"t{i}", "content": "c"} for i in range(3)]
+    response = client.post("/api/posts/bulk", json=items, headers=headers)
+    assert response.status_code == 413
+    assert post_count(client, user_id) == 0
+
+
+def test_oversized_ndjson_stops_at_the_limit(client, make_user, small_bulk):
+    user_id, headers = make_user()
+    body = "\n".join(json.dumps({"title": f"t{i}", "content": "c"}) for i in range(3))
+    response = client.post(
+        "/api/posts/bulk",
+        content=body,
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["truncated"] is True
+    assert result["created"] == 2
+    assert [item["index"] for item in result["results"]] == [0, 1]
+    assert all(item["id"] for item in result["results"])
+    assert post_count(client, user_id) == 2
+
+
+def test_partial_failure_reports_each_item(client, make_user):
+    _, headers = make_user()
+    items = [{"title": "ok", "content": "c"}, {"title": "missing content"}, {"title": "ok", "content": "c"}]
+    result = client.post("/api/posts/bulk", json=items, headers=headers).json()
+    assert (result["created"], result["failed"], result["truncated"]) == (2, 1, False)
+    assert result["results"][1]["id"] is None
+    assert "content" in result["results"][1]["error"]
+
+
+def test_returned_ids_match_rows_from_one_insert(client, make_user, make_post):
+    _, headers = make_user()
+    items = [{"title": f"bulk {i}", "content": f"c{i}"} for i in range(50)]
+    response = client.post("/api/posts/bulk", json=items, headers=headers)
+    ids = [item["id"] for item in response.json()["results"]]
+    # not one INSERT per row
+    queries = int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+    assert queries < 10
+    assert [client.get(f"/api/posts/{post_id}").json()["title"] for post_id in ids] == [item["title"] for item in items]
+
+    post_id = make_post(headers)
+    comments = [{"post_id": post_id, "content": f"reply {i}"} for i in range(5)]
+    result = client.post("/api/posts/comments/bulk", json=comments, headers=headers).json()
+    listed = client.get(f"/api/posts/{post_id}/comments").json()
+    assert [item["id"] for item in result["results"]] == [comment["id"] for comment in listed]
+    assert [comment["content"] for comment in listed] == [item["content"] for item in comments]
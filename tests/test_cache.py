@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from src.cache import CacheBackend, LRUCache
+from src.response_cache import ResponseCache
+
+
+def test_incomplete_backend_fails_at_construction():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_tag_invalidation_rebuilds_entry():
+    cache = ResponseCache(LRUCache(max_size=10))
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {"n": len(builds)}, ["post:1"], {}
+
+    async def scenario():
+        first = await cache.get_or_build("key", build)
+        again = await cache.get_or_build("key", build)
+        cache.invalidate("post:2")
+        unrelated = await cache.get_or_build("key", build)
+        cache.invalidate("post:1")
+        rebuilt = await cache.get_or_build("key", build)
+        return first, again, unrelated, rebuilt
+
+    first, again, unrelated, rebuilt = asyncio.run(scenario())
+    assert first is again is unrelated
+    assert rebuilt.body == b'{"n":2}'
+    assert rebuilt.etag != first.etag
+
+
+def test_build_racing_an_invalidation_is_not_kept():
+    cache = ResponseCache(LRUCache(max_size=10))
+
+    async def build():
+        # a write lands while the response is being read
+        cache.invalidate("post:1")
+        return {}, ["post:1"], {}
+
+    async def scenario():
+        await cache.get_or_build("key", build)
+        return cache._lookup("key")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_post_etag_answers_304(client, make_user, make_post):
+    _, headers = make_user()
+    post_id = make_post(headers)
+    etag = client.get(f"/api/posts/{post_id}").headers["ETag"]
+    assert client.get(f"/api/posts/{post_id}", headers={"If-None-Match": etag}).status_code == 304
+    client.put(f"/api/posts/{post_id}", json={"title": "edited"}, headers=headers)
+    response = client.get(f"/api/posts/{post_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "edited"
+
+
+def test_builds_within_replica_lag_are_not_kept(monkeypatch):
+    cache = ResponseCache(LRUCache(max_size=10), replica_lag=2.0)
+    now = [1000.0]
+    monkeypatch.setattr("src.response_cache.time.time", lambda: now[0])
+
+    async def build():
+        return {}, ["post:1"], {}
+
+    async def scenario():
+        cache.invalidate("post:1")
+        await cache.get_or_build("key", build)
+        stale = cache._lookup("key")
+        now[0] += 3
+        await cache.get_or_build("key", build)
+        return stale, cache._lookup("key")
+
+    stale, settled = asyncio.run(scenario())
+    assert stale is None
+    assert settled is not None
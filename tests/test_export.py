@@ -0,0 +1,15 @@
+import json
+
+
+def test_exports_require_authentication(client):
+    assert client.get("/api/posts/export").status_code == 401
+    assert client.get("/api/posts/comments/export").status_code == 401
+
+
+def test_post_export_streams_ndjson(client, make_user, make_post):
+    _, headers = make_user()
+    post_id = make_post(headers, title="exported")
+    response = client.get("/api/posts/export", headers=headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {"id": post_id, "title": "exported"}.items() <= next(row for row in rows if row["id"] == post_id).items()
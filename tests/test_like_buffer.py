@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, update
+
+from src.database import SessionLocal
+from src.like_buffer import LikeBuffer, LikeBufferFull
+from src.models import Post, UserStats
+
+
+def test_add_rejects_when_a_full_buffer_cannot_flush():
+    like_buffer = LikeBuffer(max_batch=10, flush_interval=1, max_pending=2)
+
+    async def failing_write(batch):
+        raise RuntimeError("database is down")
+
+    like_buffer._write = failing_write
+
+    async def scenario():
+        assert await like_buffer.add(1, 1)
+        assert await like_buffer.add(1, 2)
+        assert not await like_buffer.add(1, 2)
+        with pytest.raises(LikeBufferFull):
+            await like_buffer.add(1, 3)
+        # the failed batch is kept for the next flush, but nothing beyond max_pending
+        assert like_buffer.queue_depth == 2
+        assert like_buffer.flush_errors == 1
+
+    asyncio.run(scenario())
+
+
+def test_flush_bumps_counters_by_new_likes_only(client, make_user, make_post):
+    author_id, author = make_user()
+    early_id, early = make_user()
+    late_id, _ = make_user()
+    post_id = make_post(author)
+    # stored directly, before the buffer sees it again
+    assert client.post(f"/api/posts/{post_id}/like", headers=early).status_code == 201
+
+    async def scenario():
+        async with SessionLocal() as db:
+            # a comment counter that a like flush has no business touching
+            await db.execute(update(Post).where(Post.id == post_id).values(comment_count=7))
+            await db.commit()
+        like_buffer = LikeBuffer(max_batch=10, flush_interval=1, max_pending=10)
+        await like_buffer.add(post_id, early_id)
+        await like_buffer.add(post_id, late_id)
+        await like_buffer.add(post_id + 10**6, late_id)
+        await like_buffer.flush()
+        async with SessionLocal() as db:
+            q = await db.execute(select(Post.like_count, Post.comment_count).where(Post.id == post_id))
+            stats = await db.execute(
+                select(UserStats.user_id, UserStats.likes_given, UserStats.likes_received)
+                .where(UserStats.user_id.in_([author_id, early_id, late_id]))
+            )
+            return tuple(q.one()), {row.user_id: (row.likes_given, row.likes_received) for row in stats}, like_buffer
+
+    counts, stats, like_buffer = asyncio.run(scenario())
+    assert counts == (2, 7)
+    assert stats == {author_id: (0, 2), early_id: (1, 0), late_id: (1, 0)}
+    assert (like_buffer.flushed_total, like_buffer.inserted_total, like_buffer.dropped_total) == (2, 1, 1)
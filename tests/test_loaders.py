@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from src import loaders
+from src.loaders import PostLoader
+
+
+def test_loads_in_one_tick_are_fetched_together(monkeypatch):
+    queries = []
+
+    async def fake_fetch_posts(db, stmt):
+        queries.append(stmt)
+        return [{"id": 1}, {"id": 2}] if len(queries) == 1 else []
+
+    monkeypatch.setattr(loaders, "fetch_posts", fake_fetch_posts)
+
+    async def scenario():
+        loader = PostLoader(db=None)
+        found = await loader.load_many([2, 1, 3, 2])
+        return found, loader._tasks
+
+    found, tasks = asyncio.run(scenario())
+    assert found == [{"id": 2}, {"id": 1}, None, {"id": 2}]
+    # one query for the live table, one for the ids it lacks in the archive
+    assert len(queries) == 2
+    assert not tasks
+
+
+def test_cancelled_dispatch_releases_waiters(monkeypatch):
+    async def stuck_fetch_posts(db, stmt):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(loaders, "fetch_posts", stuck_fetch_posts)
+
+    async def scenario():
+        loader = PostLoader(db=None)
+        future = loader.load(1)
+        await asyncio.sleep(0.01)
+        (task,) = loader._tasks
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await future
+        # a later load starts over instead of reusing the cancelled future
+        assert 1 not in loader._results
+
+    asyncio.run(scenario())
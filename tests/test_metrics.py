@@ -0,0 +1,46 @@
+from src.metrics import LATENCY_BUCKETS, MetricsRegistry, RequestStats
+
+
+def families(text):
+    return {line.split()[2]: line.split()[3] for line in text.splitlines() if line.startswith("# TYPE")}
+
+
+def test_latency_is_one_histogram_family():
+    registry = MetricsRegistry()
+    registry.observe("GET", "/api/posts", 200, 0.02, RequestStats())
+    registry.observe("GET", "/api/posts", 200, 3.0, RequestStats())
+    text = registry.render({})
+
+    types = families(text)
+    assert types["http_request_duration_seconds"] == "histogram"
+    assert not any(name.startswith("http_request_duration_seconds_") for name in types)
+
+    samples = dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+    labels = 'method="GET",route="/api/posts"'
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="0.025"}}'] == "1"
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="{LATENCY_BUCKETS[-1]}"}}'] == "2"
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == "2"
+    assert samples[f"http_request_duration_seconds_count{{{labels}}}"] == "2"
+    assert float(samples[f"http_request_duration_seconds_sum{{{labels}}}"]) == 3.02
+
+
+def test_samples_follow_their_family_header():
+    registry = MetricsRegistry()
+    registry.observe("POST", "/api/posts", 201, 0.1, RequestStats())
+    family = None
+    for line in registry.render({}).splitlines():
+        if line.startswith("# TYPE"):
+            family = line.split()[2]
+        elif not line.startswith("#"):
+            assert line.startswith(family)
+
+
+def test_rows_affected_counts_writes_only(client, make_user, make_post):
+    _, headers = make_user()
+    post_id = make_post(headers)
+    assert client.get(f"/api/posts/{post_id}/comments").status_code == 200
+    samples = dict(
+        line.rsplit(" ", 1) for line in client.get("/metrics").text.splitlines() if line.startswith("db_rows_affected_total")
+    )
+    assert int(samples['db_rows_affected_total{method="POST",route="/api/posts"}']) > 0
+    assert samples['db_rows_affected_total{method="GET",route="/api/posts/{post_id}/comments"}'] == "0"
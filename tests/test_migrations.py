@@ -0,0 +1,69 @@
+import asyncio
+
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.migrations import LATEST_VERSION, migrate, pending_migrations, reset_schema
+from src.models import Post, User
+
+
+def test_reset_schema_rebuilds_search_index(tmp_path):
+    async def scenario():
+        db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/reset.db")
+        try:
+            assert (await migrate(db_engine))[-1] == LATEST_VERSION
+            async with db_engine.begin() as conn:
+                await conn.execute(insert(User.__table__), [{"id": 1, "username": "a", "password": "x"}])
+                await conn.execute(insert(Post.__table__), [{"title": "stale", "content": "old", "author_id": 1}])
+
+            assert (await reset_schema(db_engine))[-1] == LATEST_VERSION
+            assert await pending_migrations(db_engine) == []
+            async with db_engine.begin() as conn:
+                await conn.execute(insert(User.__table__), [{"id": 1, "username": "a", "password": "x"}])
+                await conn.execute(insert(Post.__table__), [{"title": "fresh", "content": "new", "author_id": 1}])
+                triggers = await conn.run_sync(
+                    lambda sync: sync.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+                )
+                stale = await conn.execute(text("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'stale'"))
+                fresh = await conn.execute(text("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'fresh'"))
+                assert sorted(triggers) == ["posts_fts_ad", "posts_fts_ai", "posts_fts_au"]
+                assert stale.all() == []
+                assert fresh.scalars().all() == [1]
+        finally:
+            await db_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_migrate_is_idempotent(tmp_path):
+    async def scenario():
+        db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/twice.db")
+        try:
+            assert await migrate(db_engine)
+            assert await migrate(db_engine) == []
+            async with db_engine.connect() as conn:
+                tables = await conn.run_sync(lambda sync: inspect(sync).get_table_names())
+                versions = (await conn.execute(text("SELECT count(*) FROM schema_migrations"))).scalar()
+            assert {"posts", "user_stats", "posts_archive", "posts_fts"} <= set(tables)
+            assert versions == LATEST_VERSION
+        finally:
+            await db_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_migrations_apply_each_version_once(tmp_path):
+    async def scenario():
+        db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/race.db")
+        try:
+            results = await asyncio.gather(*[migrate(db_engine) for _ in range(4)])
+            async with db_engine.connect() as conn:
+                versions = (await conn.execute(text("SELECT count(*) FROM schema_migrations"))).scalar()
+            return results, versions
+        finally:
+            await db_engine.dispose()
+
+    results, versions = asyncio.run(scenario())
+    # one process migrates; the others wait on the lock and find nothing left to do
+    assert sorted(results, key=len) == [[], [], [], list(range(1, LATEST_VERSION + 1))]
+    assert versions == LATEST_VERSION
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import update
+
+from src.database import engine
+from src.models import Post
+from src.pagination import NEXT_CURSOR_HEADER
+
+
+def walk(client, path, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+def test_post_cursor_breaks_created_at_ties_by_id(client, make_user, make_post):
+    author_id, headers = make_user()
+    post_ids = [make_post(headers, title=f"p{n}") for n in range(5)]
+
+    async def same_timestamp():
+        async with engine.begin() as conn:
+            await conn.execute(update(Post).where(Post.id.in_(post_ids)).values(created_at=datetime(2020, 1, 1)))
+
+    client.portal.call(same_timestamp)
+    pages = walk(client, "/api/posts", author_id=author_id, limit=2)
+    assert pages == [post_ids[4:2:-1], post_ids[2:0:-1], post_ids[:1]]
+
+
+def test_comment_pages_cover_every_comment_once(client, make_user, make_post):
+    _, headers = make_user()
+    post_id = make_post(headers)
+    comment_ids = [
+        client.post(f"/api/posts/{post_id}/comment", json={"content": f"c{n}"}, headers=headers).json()["id"]
+        for n in range(5)
+    ]
+    pages = walk(client, f"/api/posts/{post_id}/comments", limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(sum(pages, [])) == comment_ids
+
+
+def test_malformed_cursor_is_rejected(client):
+    assert client.get("/api/posts", params={"cursor": "not-a-cursor"}).status_code == 400
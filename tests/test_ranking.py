@@ -0,0 +1,16 @@
+import asyncio
+
+from src import ranking as ranking_module
+from src.ranking import ranking
+from src.routes import posts
+
+
+def test_ranked_feed_answers_503_until_rankings_load(client, monkeypatch):
+    monkeypatch.setattr(posts, "RANKING_ENABLED", True)
+    monkeypatch.setattr(ranking_module, "RANKING_READY_TIMEOUT", 0.05)
+    # as if the first load kept failing
+    monkeypatch.setattr(ranking, "_ready", asyncio.Event())
+
+    response = client.get("/api/posts", params={"sort": "top"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from src import ratelimit
+from src.ratelimit import AdaptiveConcurrencyLimiter, InMemoryRateLimitBackend, RateLimitBackend
+
+
+def test_incomplete_backend_fails_at_construction():
+    class Incomplete(RateLimitBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_token_bucket_allows_burst_then_waits():
+    backend = InMemoryRateLimitBackend(max_keys=10)
+
+    async def takes():
+        return [await backend.take("key", rate=1, burst=2) for _ in range(3)]
+
+    first, second, third = asyncio.run(takes())
+    assert first == second == 0
+    assert 0.9 < third <= 1
+
+
+def test_buckets_are_bounded():
+    backend = InMemoryRateLimitBackend(max_keys=2)
+
+    async def fill():
+        for key in range(5):
+            await backend.take(key, rate=1, burst=1)
+
+    asyncio.run(fill())
+    assert list(backend._buckets) == [3, 4]
+
+
+def test_limiter_shrinks_on_average_checkout_wait():
+    stats = {"primary": {"checkout_count": 0, "wait_seconds_total": 0.0}}
+    limiter = AdaptiveConcurrencyLimiter(2, 100, target_wait=0.01, write_share=0.5, pool_stats=lambda: stats, adjust_interval=0)
+    # 10 checkouts that waited 0.05s each on average
+    stats["primary"] = {"checkout_count": 10, "wait_seconds_total": 0.5}
+    limiter.acquire(write=False)
+    assert limiter.limit == 75
+
+
+@pytest.fixture
+def user_headers(make_user):
+    # registered before strict_limits applies, or registering would use up the budget
+    return make_user()[1]
+
+
+@pytest.fixture
+def strict_limits(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_USER_RATE", 0.001)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_USER_BURST", 1)
+    ratelimit.rate_limit_backend._buckets.clear()
+    yield
+    ratelimit.rate_limit_backend._buckets.clear()
+
+
+def login(client, forwarded_for):
+    return client.post(
+        "/api/auth/login",
+        data={"username": "nobody", "password": "wrong"},
+        headers={"X-Forwarded-For": forwarded_for},
+    )
+
+
+def test_user_bucket_answers_429_with_retry_after(client, user_headers, strict_limits):
+    headers = user_headers
+    assert client.post("/api/posts", json={"title": "t", "content": "c"}, headers=headers).status_code == 201
+    response = client.post("/api/posts", json={"title": "t", "content": "c"}, headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_forwarded_for_ignored_from_untrusted_peers(client, strict_limits):
+    assert login(client, "1.1.1.1").status_code == 400
+    assert login(client, "2.2.2.2").status_code == 429
+
+
+def test_forwarded_for_honoured_from_trusted_proxies(client, strict_limits, monkeypatch):
+    # TestClient connects as "testclient"
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUSTED_PROXIES", {"testclient"})
+    assert login(client, "1.1.1.1").status_code == 400
+    assert login(client, "2.2.2.2").status_code == 400
+    assert login(client, "9.9.9.9, 1.1.1.1").status_code == 429
+
+
+def test_batch_reads_are_not_rate_limited(client, user_headers, strict_limits):
+    headers = user_headers
+    for _ in range(3):
+        assert client.post("/api/posts/batch", json={"ids": [1]}, headers=headers).status_code == 200
+
+
+def test_exports_draw_from_the_export_bucket(client, user_headers, strict_limits, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_EXPORT_RATE", 0.001)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_EXPORT_BURST", 1)
+    assert client.get("/api/posts/export", headers=user_headers).status_code == 200
+    assert client.get("/api/posts/comments/export", headers=user_headers).status_code == 429
+    # writes keep their own budget
+    assert client.post("/api/posts", json={"title": "t", "content": "c"}, headers=user_headers).status_code == 201
@@ -0,0 +1,44 @@
+import pytest
+
+from src.realtime import hub
+from src.routes.realtime import _apply
+
+
+@pytest.mark.parametrize("message", [
+    [1, 2],
+    {"subscribe": 5},
+    {"subscribe": "a", "unsubscribe": []},
+    {"unsubscribe": {"1": 1}},
+    {"subscribe": [True]},
+    {"subscribe": [1.5]},
+    {"feed": "yes"},
+])
+def test_malformed_commands_raise_value_error(message):
+    subscription = hub.subscribe()
+    try:
+        with pytest.raises(ValueError):
+            _apply(subscription, message)
+        assert subscription.topics == set()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def test_socket_keeps_answering_after_a_bad_command(client):
+    with client.websocket_connect("/api/ws") as websocket:
+        websocket.send_text('{"subscribe": 5}')
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text('{"subscribe": [true]}')
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+
+
+def test_incomplete_broker_fails_at_construction():
+    from src.realtime import Broker
+
+    class Incomplete(Broker):
+        def publish(self, topic, event):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
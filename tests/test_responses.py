@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from src import responses
+from src.responses import FastJSONResponse, encode_json, fast_json
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    monkeypatch.setattr(responses, "FAST_JSON", True)
+
+
+def test_fast_json_is_a_no_op_when_disabled():
+    content = [{"id": 1}]
+    assert fast_json(content) is content
+
+
+def test_fast_json_encodes_directly(fast):
+    response = fast_json([{"id": 1, "title": "héllo"}], status_code=201)
+    assert isinstance(response, FastJSONResponse)
+    assert response.status_code == 201
+    assert json.loads(response.body) == [{"id": 1, "title": "héllo"}]
+
+
+def test_cached_encoding_does_not_depend_on_the_flag(fast):
+    # stdlib and orjson disagree on e.g. float exponents; cached bodies always use the stdlib form
+    assert encode_json({"score": 1e16}) == b'{"score":1e+16}'
+    if responses.orjson is not None:
+        assert FastJSONResponse({"score": 1e16}).body == b'{"score":1e16}'
+
+
+def test_endpoints_answer_the_same_with_fast_json(client, make_user, make_post, monkeypatch):
+    _, headers = make_user()
+    post_id = make_post(headers, title="fast path")
+    slow = client.get("/api/posts/search", params={"q": "fast path"})
+    cached = client.get(f"/api/posts/{post_id}")
+    monkeypatch.setattr(responses, "FAST_JSON", True)
+    assert client.get("/api/posts/search", params={"q": "fast path"}).json() == slow.json()
+    assert client.put(f"/api/posts/{post_id}", json={"title": "fast path"}, headers=headers).status_code == 200
+    # rebuilt with the flag on, the cached body and its ETag are unchanged
+    assert client.get(f"/api/posts/{post_id}").headers["ETag"] == cached.headers["ETag"]
@@ -0,0 +1,45 @@
+import uuid
+
+
+def word():
+    # unique per test, so posts from other tests never match
+    return "w" + uuid.uuid4().hex[:12]
+
+
+def search(client, q):
+    response = client.get("/api/posts/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [post["id"] for post in response.json()]
+
+
+def test_results_are_ordered_by_relevance(client, make_user, make_post):
+    _, headers = make_user()
+    term = word()
+    in_content = make_post(headers, title="unrelated", content=f"a long text that mentions {term} once among many other words")
+    in_title = make_post(headers, title=f"{term} explained", content=f"all about {term}")
+    make_post(headers, title="no match", content="nothing to see")
+    assert search(client, term) == [in_title, in_content]
+
+
+def test_every_term_must_match(client, make_user, make_post):
+    _, headers = make_user()
+    first, second = word(), word()
+    both = make_post(headers, title=first, content=second)
+    make_post(headers, title=first, content="only one")
+    assert search(client, f"{first} {second}") == [both]
+
+
+def test_index_follows_updates_and_deletes(client, make_user, make_post):
+    _, headers = make_user()
+    old, new = word(), word()
+    post_id = make_post(headers, title="edited", content=old)
+    assert client.put(f"/api/posts/{post_id}", json={"content": new}, headers=headers).status_code == 200
+    assert search(client, old) == []
+    assert search(client, new) == [post_id]
+    assert client.delete(f"/api/posts/{post_id}", headers=headers).status_code == 200
+    assert search(client, new) == []
+
+
+def test_query_without_words_is_rejected(client):
+    response = client.get("/api/posts/search", params={"q": "!!! --- ???"})
+    assert response.status_code == 400
@@ -0,0 +1,59 @@
+import pytest
+
+from src import timeline
+from src.routes import users
+
+
+@pytest.fixture
+def fanout_threshold(monkeypatch):
+    monkeypatch.setattr(timeline, "FANOUT_MAX_FOLLOWERS", 1)
+    monkeypatch.setattr(users, "FANOUT_MAX_FOLLOWERS", 1)
+
+
+def timeline_ids(client, headers, **params):
+    response = client.get("/api/timeline", params=params, headers=headers)
+    assert response.status_code == 200
+    return [post["id"] for post in response.json()], response.headers.get("X-Next-Cursor")
+
+
+def test_author_crossing_threshold_is_not_duplicated(client, make_user, make_post, fanout_threshold):
+    author, author_headers = make_user()
+    _, reader = make_user()
+    _, other = make_user()
+    client.post(f"/api/users/{author}/follow", headers=reader)
+    pushed = make_post(author_headers)
+    # a second follower moves the author over the threshold: new posts are pulled at read time
+    client.post(f"/api/users/{author}/follow", headers=other)
+    pulled = make_post(author_headers)
+
+    ids, _ = timeline_ids(client, reader)
+    assert ids == [pulled, pushed]
+
+
+def test_author_dropping_below_threshold_keeps_pulled_posts(client, make_user, make_post, fanout_threshold):
+    author, author_headers = make_user()
+    _, reader = make_user()
+    _, other = make_user()
+    client.post(f"/api/users/{author}/follow", headers=reader)
+    client.post(f"/api/users/{author}/follow", headers=other)
+    pulled = make_post(author_headers)
+    assert client.delete(f"/api/users/{author}/follow", headers=other).status_code == 200
+
+    ids, _ = timeline_ids(client, reader)
+    assert ids == [pulled]
+
+
+def test_deleted_post_does_not_shorten_page(client, make_user, make_post):
+    author, author_headers = make_user()
+    _, reader = make_user()
+    client.post(f"/api/users/{author}/follow", headers=reader)
+    older = make_post(author_headers)
+    newer = make_post(author_headers)
+    newest = make_post(author_headers)
+    client.delete(f"/api/posts/{newest}", headers=author_headers)
+
+    ids, cursor = timeline_ids(client, reader, limit=1)
+    assert ids == [newer]
+    assert cursor is not None
+    ids, _ = timeline_ids(client, reader, limit=1, cursor=cursor)
+    assert ids == [older]
@@ -0,0 +1,33 @@
+from sqlalchemy import delete
+
+from src.database import engine
+from src.models import UserStats
+
+
+def stats(client, user_id):
+    response = client.get(f"/api/users/{user_id}/stats")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_writes_update_user_stats(client, make_user, make_post):
+    author_id, author = make_user()
+    liker_id, liker = make_user()
+    post_id = make_post(author)
+    assert client.post(f"/api/posts/{post_id}/comment", json={"content": "hi"}, headers=liker).status_code == 201
+    assert client.post(f"/api/posts/{post_id}/like", headers=liker).status_code in (200, 201)
+    assert {"post_count": 1, "likes_received": 1}.items() <= stats(client, author_id).items()
+    assert {"comment_count": 1, "likes_given": 1}.items() <= stats(client, liker_id).items()
+
+
+def test_bump_creates_a_missing_stats_row(client, make_user, make_post):
+    user_id, headers = make_user()
+
+    async def drop_row():
+        async with engine.begin() as conn:
+            await conn.execute(delete(UserStats).where(UserStats.user_id == user_id))
+
+    client.portal.call(drop_row)
+    make_post(headers)
+    make_post(headers)
+    assert stats(client, user_id)["post_count"] == 2